@@ -0,0 +1,241 @@
+# Z-score alerts on macro data refreshes, delivered to pluggable sinks
+import os
+import json
+import time
+import queue
+import logging
+import threading
+import urllib.request
+from collections import deque
+
+import numpy as np
+
+from dashboard import DASHBOARD_TABLES
+from macro_data import on_refresh, start_refresher, touched_series
+
+
+logger = logging.getLogger(__name__)
+
+# z-score bands, matching the style_data_conditional rules on the home page
+WARNING_Z = 1.0
+ALARM_Z = 2.0
+
+# alerts waiting for the sink before new ones are dropped
+QUEUE_SIZE = 1000
+
+# +1 where a rise is coloured red on the home page (tomato/red), -1 where a fall is
+RISK_SIGN = {
+    "treas-rates-table": 1,
+    "curve-rates-table": -1,
+    "ilbe-rates-table": 1,
+    "equity-indices-table": -1,
+    "vol-table": 1,
+    "baml-rates-table": 1,
+    "corp-rates-table": 1,
+    "currency-table": -1,
+    "commodities-table": -1,
+}
+
+
+def default_thresholds(days=5):
+    # {series: {horizon days: (warning z, alarm z)}} for every dashboard series
+    return {
+        name: {days: (WARNING_Z, ALARM_Z)}
+        for names in DASHBOARD_TABLES.values()
+        for name in names
+    }
+
+
+def _risk_signs():
+    return {
+        name: RISK_SIGN[table_id]
+        for table_id, names in DASHBOARD_TABLES.items()
+        for name in names
+    }
+
+
+# Sinks. Anything with a send(alert) method can be passed to AlertEngine.
+
+class LogFileSink:
+    def __init__(self, path="alerts.log"):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, alert):
+        with self._lock, open(self.path, "a") as f:
+            f.write(json.dumps(alert) + "\n")
+
+
+class WebhookSink:
+    def __init__(self, url="http://127.0.0.1:8099/alerts", timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, alert):
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(alert).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        urllib.request.urlopen(request, timeout=self.timeout).close()
+
+
+def sink_from_env():
+    # RISKBOARD_ALERT_SINK is "log:<path>" or "webhook:<url>"
+    kind, _, target = os.environ.get("RISKBOARD_ALERT_SINK", "log:alerts.log").partition(":")
+    if kind == "webhook":
+        return WebhookSink(target)
+    return LogFileSink(target or "alerts.log")
+
+
+class AlertEngine:
+    def __init__(self, sink, thresholds=None, risk_signs=None, latency_window=1000):
+        self.sink = sink
+        self.thresholds = thresholds if thresholds is not None else default_thresholds()
+        self.risk_signs = risk_signs if risk_signs is not None else _risk_signs()
+
+        # (series, days) -> band of the last alert sent, so a breach that
+        # persists across refreshes is only reported once
+        self._bands = {}
+        self._baselined = False
+        self._latencies = deque(maxlen=latency_window)
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+        # evaluate runs inside the snapshot refresh, possibly on a user's
+        # request, so a slow or dead sink is only ever waited on by this thread
+        self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+        threading.Thread(target=self._deliver, name="alert-sink", daemon=True).start()
+
+    def _deliver(self):
+        while True:
+            alert, arrived_at = self._queue.get()
+            try:
+                alert = {**alert, "latency_ms": round((time.time() - arrived_at) * 1000, 2)}
+                self.sink.send(alert)
+            except Exception:
+                self.failed += 1
+                logger.exception("alert sink %r failed", self.sink)
+            else:
+                self.sent += 1
+                self._latencies.append(alert["latency_ms"])
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        # blocks until every queued alert has been handed to the sink
+        self._queue.join()
+
+    def evaluate(self, macro_df, series, arrived_at=None, notify=True):
+        # re-check only the given series; returns the alerts raised. With
+        # notify=False the bands are recorded but nothing is sent
+        if arrived_at is None:
+            arrived_at = time.time()
+
+        series = [name for name in series if name in self.thresholds and name in macro_df]
+        alerts = []
+        with self._lock:
+            for name in series:
+                values = macro_df[name].to_numpy(dtype=np.float64)
+                for days, (warning, alarm) in self.thresholds[name].items():
+                    if len(values) <= days:
+                        continue
+
+                    changes = values[days:] - values[:-days]
+                    if np.isnan(changes[-1]):
+                        # no latest value: keep the band, so a breach that is
+                        # still standing when the data returns isn't re-sent
+                        continue
+                    std = np.nanstd(changes, ddof=1)
+                    z = changes[-1] / std
+
+                    band = 0
+                    if abs(z) > alarm:
+                        band = int(np.sign(z)) * 2
+                    elif abs(z) > warning:
+                        band = int(np.sign(z))
+
+                    if band == self._bands.get((name, days), 0):
+                        continue
+                    self._bands[(name, days)] = band
+                    if band == 0 or not notify:
+                        continue
+
+                    risk = "risk-off" if np.sign(z) == self.risk_signs.get(name, 1) else "risk-on"
+                    alerts.append({
+                        "series": name,
+                        "horizon": days,
+                        "level": "alarm" if abs(band) == 2 else "warning",
+                        "direction": risk,
+                        "z_score": round(float(z), 3),
+                        "change": round(float(changes[-1]), 4),
+                        "value": round(float(values[-1]), 4),
+                    })
+
+        for alert in alerts:
+            try:
+                self._queue.put_nowait((alert, arrived_at))
+            except queue.Full:
+                self.dropped += 1
+                logger.warning("alert queue full, dropped alert for %s", alert["series"])
+
+        return alerts
+
+    def baseline(self, macro_df):
+        # breaches already standing when the engine starts are recorded, not
+        # sent, so a restart doesn't re-send them
+        self.evaluate(macro_df, list(macro_df.columns), notify=False)
+        self._baselined = True
+
+    def on_refresh(self, previous_df, macro_df, version, arrived_at):
+        if not self._baselined:
+            self.baseline(previous_df if previous_df is not None else macro_df)
+            if previous_df is None:
+                return
+
+        series = touched_series(previous_df, macro_df)
+        alerts = self.evaluate(macro_df, series, arrived_at)
+        logger.info(
+            "alerts: version %s touched %d series, sent %d alerts", version, len(series), len(alerts)
+        )
+
+    def metrics(self):
+        # data arrival -> sink latency over the last latency_window alerts
+        latencies = np.array(self._latencies)
+        metrics = {
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+        }
+        if len(latencies):
+            metrics.update({
+                "latency_p50_ms": float(np.percentile(latencies, 50)),
+                "latency_p99_ms": float(np.percentile(latencies, 99)),
+                "latency_max_ms": float(latencies.max()),
+            })
+        return metrics
+
+
+_engine = {"engine": None}
+
+
+def start_alerts(sink=None, thresholds=None):
+    # evaluates alerts on every snapshot refresh, in the background. The
+    # de-dupe state lives in this process, so run it in one process only
+    # (e.g. a single worker with RISKBOARD_ALERTS=1), not in every worker
+    if _engine["engine"] is None:
+        engine = AlertEngine(sink if sink is not None else sink_from_env(), thresholds)
+        on_refresh(engine.on_refresh)
+        _engine["engine"] = engine
+        start_refresher()
+
+    return _engine["engine"]
+
+
+def alert_metrics():
+    engine = _engine["engine"]
+    return engine.metrics() if engine is not None else {}
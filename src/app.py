@@ -1,4 +1,5 @@
 # Data manipulation libraries
+import os
 import numpy as np
 import pandas as pd
 
@@ -15,6 +16,11 @@ import plotly.express as px
 from plotly.subplots import make_subplots
 import plotly.io as pio
 
+from alerts import start_alerts, alert_metrics
+from export_api import export_api
+from profiling import install_profiler
+from callback_cache import cache as callback_cache
+
 
 USERNAME_PASSWORD_PAIRS = [['root', 'root']]
 
@@ -65,9 +71,32 @@ app = dash.Dash(external_stylesheets=[dbc.themes.SUPERHERO],
                 use_pages=True,
                 suppress_callback_exceptions=True)
 app.title = "riskboard"
+
+# Flask routes are added before BasicAuth so they sit behind the same login
+
+app.server.register_blueprint(export_api)
+# auth is created below; the profiler only asks it once a request comes in
+install_profiler(app.server, authenticated=lambda: auth.is_authorized())
+
+
+@app.server.route("/metrics/alerts")
+def serve_alert_metrics():
+    return alert_metrics()
+
+
+@app.server.route("/metrics/callback-cache")
+def serve_callback_cache_metrics():
+    return callback_cache.metrics()
+
+
 auth = dash_auth.BasicAuth(app, USERNAME_PASSWORD_PAIRS)
 server = app.server
 
+# opt-in: enable in exactly one process, since every process that starts the
+# engine sends its own alerts
+if os.environ.get("RISKBOARD_ALERTS", "0") == "1":
+    start_alerts()
+
 # Sidebar implemention
 
 def serve_layout():
@@ -0,0 +1,188 @@
+# Memoized callback results, keyed on input values and the macro data version
+import os
+import hmac
+import pickle
+import hashlib
+import logging
+import functools
+import threading
+from collections import OrderedDict
+
+from plotly.basedatatypes import BaseFigure
+
+from macro_data import get_macro_snapshot, on_refresh
+
+
+logger = logging.getLogger(__name__)
+
+# bytes of pickled results kept in this process before the least recently
+# used are evicted
+CACHE_MAX_BYTES = int(os.environ.get("RISKBOARD_CACHE_MAX_BYTES", 256 * 2**20))
+
+# optional directory shared by every worker; unset keeps the cache in-process.
+# Results are unpickled from it, so it is created private to the app user and
+# every file is signed with RISKBOARD_CACHE_SECRET (the same in every worker);
+# without a secret the disk tier stays off
+CACHE_DIR = os.environ.get("RISKBOARD_CACHE_DIR")
+CACHE_SECRET = os.environ.get("RISKBOARD_CACHE_SECRET")
+
+
+class CallbackCache:
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, disk_dir=CACHE_DIR, secret=CACHE_SECRET):
+        if disk_dir and not secret:
+            logger.warning("RISKBOARD_CACHE_DIR is set without RISKBOARD_CACHE_SECRET; disk cache disabled")
+            disk_dir = None
+
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._key = secret.encode() if secret else None
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejected = 0
+        if disk_dir:
+            os.makedirs(disk_dir, mode=0o700, exist_ok=True)
+            if os.stat(disk_dir).st_mode & 0o077:
+                logger.warning("callback cache directory %s is readable or writable by other users", disk_dir)
+
+    def _sign(self, blob):
+        return hmac.new(self._key, blob, hashlib.sha256).digest()
+
+    def _disk_path(self, version, digest):
+        # the version leads the file name so stale files are easy to sweep
+        return os.path.join(self.disk_dir, f"{version}-{digest}.pkl")
+
+    def get(self, version, digest):
+        # pickled result, or None on a miss
+        with self._lock:
+            blob = self._entries.get((version, digest))
+            if blob is not None:
+                self._entries.move_to_end((version, digest))
+                self.hits += 1
+                return blob
+
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(version, digest), "rb") as f:
+                    signed = f.read()
+            except FileNotFoundError:
+                pass
+            else:
+                # a file this cache didn't sign is never unpickled
+                signature, blob = signed[:32], signed[32:]
+                if hmac.compare_digest(signature, self._sign(blob)):
+                    self._store(version, digest, blob)
+                    with self._lock:
+                        self.disk_hits += 1
+                    return blob
+                with self._lock:
+                    self.rejected += 1
+                logger.warning("ignoring unsigned callback cache file for %s", digest)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _store(self, version, digest, blob):
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop((version, digest), None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[(version, digest)] = blob
+            self._bytes += len(blob)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def set(self, version, digest, blob):
+        self._store(version, digest, blob)
+        if self.disk_dir:
+            # write-then-rename so other workers never read a partial file
+            path = self._disk_path(version, digest)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as f:
+                f.write(self._sign(blob) + blob)
+            os.replace(tmp, path)
+
+    def invalidate(self, version):
+        # drop every result computed from a snapshot other than `version`
+        with self._lock:
+            for key in [key for key in self._entries if key[0] != version]:
+                self._bytes -= len(self._entries.pop(key))
+
+        if self.disk_dir:
+            for name in os.listdir(self.disk_dir):
+                if name.endswith(".pkl") and not name.startswith(f"{version}-"):
+                    try:
+                        os.remove(os.path.join(self.disk_dir, name))
+                    except FileNotFoundError:
+                        pass
+
+    def metrics(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "rejected": self.rejected,
+                "hit_ratio": (self.hits + self.disk_hits) / lookups if lookups else None,
+            }
+
+
+cache = CallbackCache()
+
+
+@on_refresh
+def _invalidate_on_refresh(previous_df, macro_df, version, arrived_at):
+    cache.invalidate(version)
+
+
+def _json_ready(value):
+    # a pickled figure re-runs plotly's validation of every property when it
+    # is loaded, which costs about as much as building it; its plain dict form
+    # loads for the price of the arrays, and Dash sends either the same way
+    if isinstance(value, BaseFigure):
+        return value.to_plotly_json()
+    if isinstance(value, (list, tuple)):
+        return type(value)(_json_ready(item) for item in value)
+    return value
+
+
+def memoize_callback(func=None, cache=cache):
+    # caches a callback's return value per (callback, input values, data
+    # version). Goes between @callback and the function:
+    #
+    #   @callback(Output(...), Input(...))
+    #   @memoize_callback
+    #   def update(value): ...
+    if func is None:
+        return functools.partial(memoize_callback, cache=cache)
+
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        version, _ = get_macro_snapshot()
+        digest = hashlib.sha1(pickle.dumps((name, args, sorted(kwargs.items())))).hexdigest()
+
+        blob = cache.get(version, digest)
+        if blob is not None:
+            return pickle.loads(blob)
+
+        result = _json_ready(func(*args, **kwargs))
+        cache.set(version, digest, pickle.dumps(result))
+        return result
+
+    return wrapper
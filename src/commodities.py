@@ -0,0 +1,81 @@
+# Seasonality, rolling return / vol and roll yield for the commodity basket
+import threading
+
+import numpy as np
+import pandas as pd
+
+from dashboard import DASHBOARD_TABLES
+from macro_data import get_macro_snapshot
+
+
+COMMODITY_SERIES = DASHBOARD_TABLES["commodities-table"]
+
+# trading-day windows for rolling return / vol
+ROLLING_WINDOWS = [21, 63, 252]
+
+# share of a window's returns that must be present for its vol to be shown,
+# so a single missing print doesn't blank a whole window of the chart
+MIN_OBSERVED = 0.9
+
+
+def seasonality(returns, keys):
+    # mean daily log return (bp), its std, the share of up days and the
+    # number of days, per calendar bucket, for every series at once
+    grouped = returns.groupby(keys)
+    return pd.concat(
+        {
+            "mean_bp": grouped.mean() * 1e4,
+            "std_bp": grouped.std() * 1e4,
+            "hit_rate": (returns > 0).groupby(keys).sum() / grouped.count(),
+            "days": grouped.count(),
+        },
+        axis=1,
+    ).swaplevel(axis=1)
+
+
+def roll_yield(front_df, next_df, months_apart=1):
+    # annualized roll yield from front and next contract prices: positive in
+    # backwardation, negative in contango
+    return (front_df / next_df - 1) * 12 / months_apart * 100
+
+
+def commodity_analytics(macro_df, series=COMMODITY_SERIES, next_df=None):
+    # seasonality by calendar month and ISO week, rolling return / vol, and
+    # roll yield when next-contract prices are given, for the whole basket in
+    # one pass over the frame
+    prices = macro_df[series].astype(np.float64)
+    returns = np.log(prices).diff()
+
+    rolling = {}
+    for days in ROLLING_WINDOWS:
+        rolling[f"return_{days}d"] = (prices / prices.shift(days) - 1) * 100
+        rolling[f"vol_{days}d"] = returns.rolling(days, min_periods=int(days * MIN_OBSERVED)).std() * np.sqrt(252) * 100
+    rolling = pd.concat(rolling, axis=1).swaplevel(axis=1)
+
+    analytics = {
+        "monthly": seasonality(returns, returns.index.month.rename("month")),
+        "weekly": seasonality(
+            returns, pd.Index(returns.index.isocalendar().week.to_numpy(), name="week")
+        ),
+        "rolling": rolling,
+    }
+    if next_df is not None:
+        analytics["roll_yield"] = roll_yield(prices, next_df[series].astype(np.float64))
+
+    return analytics
+
+
+# Analytics of the whole basket per data version; the page callback slices it
+
+_analytics = {"version": None, "analytics": None}
+_analytics_lock = threading.Lock()
+
+
+def get_commodity_analytics():
+    version, macro_df = get_macro_snapshot()
+    with _analytics_lock:
+        if _analytics["version"] != version:
+            _analytics["analytics"] = commodity_analytics(macro_df)
+            _analytics["version"] = version
+
+        return _analytics["analytics"]
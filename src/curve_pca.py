@@ -0,0 +1,152 @@
+# Rolling PCA of the Treasury curve
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from macro_data import get_macro_snapshot, only_appended
+
+
+CURVE = ["2yTreas", "5yTreas", "10yTreas", "30yTreas"]
+FACTORS = ["Level", "Slope", "Curvature"]
+
+# trading days in the rolling window
+WINDOW = 252
+
+# orthogonal-iteration sweeps per day, warm-started from yesterday's factors
+SWEEPS = 2
+
+
+class RollingCurvePCA:
+    # PCA of daily curve changes (bp) over a moving window. The window's
+    # covariance is kept as running sums with a rank-one update for the day
+    # that enters and a rank-one downdate for the day that leaves, and the
+    # factors are refined from the previous day's with a couple of
+    # orthogonal-iteration sweeps and a Rayleigh-Ritz rotation, instead of a
+    # fresh decomposition of every window
+    def __init__(self, window=WINDOW, n_factors=len(FACTORS), sweeps=SWEEPS):
+        self.window = window
+        self.n_factors = n_factors
+        self.sweeps = sweeps
+        self.changes = deque()
+        self.total = None
+        self.outer = None
+        self.loadings = None
+        self.days = 0
+
+    def _recompute_sums(self):
+        # the running sums are rebuilt from the window once per window length
+        # so the add/subtract updates can't drift
+        x = np.array(self.changes)
+        self.total = x.sum(axis=0)
+        self.outer = x.T @ x
+
+    def _orient(self, loadings):
+        if self.loadings is not None:
+            # keep each factor pointing the same way as yesterday
+            signs = np.sign(np.sum(loadings * self.loadings, axis=0))
+        else:
+            # level: all tenors up; slope: long end up vs short; curvature: belly up vs wings
+            reference = np.array([
+                np.ones(len(loadings)),
+                np.linspace(-1, 1, len(loadings)),
+                -np.abs(np.linspace(-1, 1, len(loadings))) + 0.5,
+            ])[: loadings.shape[1]].T
+            signs = np.sign(np.sum(loadings * reference, axis=0))
+        signs[signs == 0] = 1
+        return loadings * signs
+
+    def update(self, change):
+        # feed one day's curve change; returns (loadings, explained variance
+        # ratios, factor scores) once the window is full, else None
+        change = np.asarray(change, dtype=np.float64)
+        if np.isnan(change).any():
+            return None
+
+        self.changes.append(change)
+        if self.total is None:
+            self.total = np.zeros(len(change))
+            self.outer = np.zeros((len(change), len(change)))
+        self.total += change
+        self.outer += np.outer(change, change)
+
+        if len(self.changes) > self.window:
+            old = self.changes.popleft()
+            self.total -= old
+            self.outer -= np.outer(old, old)
+
+        self.days += 1
+        if self.days % self.window == 0:
+            self._recompute_sums()
+
+        n = len(self.changes)
+        if n < self.window:
+            return None
+
+        cov = (self.outer - np.outer(self.total, self.total) / n) / (n - 1)
+
+        if self.loadings is None:
+            values, vectors = np.linalg.eigh(cov)
+            basis = vectors[:, ::-1][:, : self.n_factors]
+        else:
+            basis = self.loadings
+            for _ in range(self.sweeps):
+                basis, _ = np.linalg.qr(cov @ basis)
+
+        # Rayleigh-Ritz: exact eigenpairs of cov restricted to the subspace
+        values, rotation = np.linalg.eigh(basis.T @ cov @ basis)
+        order = np.argsort(values)[::-1]
+        values, loadings = values[order], basis @ rotation[:, order]
+
+        self.loadings = self._orient(loadings)
+        explained = values / np.trace(cov)
+        scores = change @ self.loadings
+        return self.loadings, explained, scores
+
+
+def rolling_curve_pca(macro_df, window=WINDOW, engine=None, start=0):
+    # runs the engine over the history from row `start`; returns a frame of
+    # daily factor scores and explained-variance ratios plus the engine, which
+    # can be handed back with the next snapshot to carry on incrementally
+    if engine is None:
+        engine = RollingCurvePCA(window)
+
+    changes = macro_df[CURVE].diff().to_numpy(dtype=np.float64) * 100
+    rows = []
+    for i in range(max(start, 1), len(changes)):
+        result = engine.update(changes[i])
+        if result is not None:
+            loadings, explained, scores = result
+            rows.append((macro_df.index[i], *scores, *explained, *loadings.T.ravel()))
+
+    columns = (
+        FACTORS
+        + [f"{factor} Explained" for factor in FACTORS]
+        + [f"{factor} {tenor}" for factor in FACTORS for tenor in CURVE]
+    )
+    result = pd.DataFrame(rows, columns=["date"] + columns).set_index("date")
+    return result, engine
+
+
+# Factors of the current snapshot, extended as new days arrive
+
+_pca = {"version": None, "df": None, "result": None, "engine": None}
+_pca_lock = threading.Lock()
+
+
+def get_curve_pca():
+    version, macro_df = get_macro_snapshot()
+    with _pca_lock:
+        if _pca["version"] == version:
+            return _pca["result"]
+
+        old = _pca["df"]
+        if only_appended(old, macro_df, CURVE):
+            tail, engine = rolling_curve_pca(macro_df, engine=_pca["engine"], start=len(old))
+            result = pd.concat([_pca["result"], tail])
+        else:
+            result, engine = rolling_curve_pca(macro_df)
+
+        _pca.update(version=version, df=macro_df, result=result, engine=engine)
+        return result
@@ -0,0 +1,189 @@
+# Home page dashboard tables, versioned for live updates
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from macro_data import get_macro_snapshot
+from percentile import get_change_index
+
+
+# DataTable id on the home page -> series shown in that table
+DASHBOARD_TABLES = {
+    # Rates Tables
+    "treas-rates-table": ["2yTreas", "5yTreas", "10yTreas", "30yTreas", "30yr Mortgage"],
+    "curve-rates-table": ["2s10s", "2s30s", "5s30s"],
+    "ilbe-rates-table": ["5y5yILBE", "5yrReal"],
+    # Equity Tables
+    "equity-indices-table": [
+        "SPX",
+        "NASDAQ",
+        "Russell",
+        "FTSE",
+        "DAX",
+        "CAC40",
+        "Nikkei",
+        "Shenzen",
+        "Hang Seng",
+    ],
+    "vol-table": ["VIX", "VVIX", "VXN"],
+    # US Credit Tables
+    "baml-rates-table": ["BAML IG OAS", "BAML HY OAS"],
+    "corp-rates-table": ["BBB OAS", "BB OAS", "B OAS", "CCC OAS"],
+    # FX Table
+    "currency-table": ["EURUSD", "USDGBP", "CHFUSD", "USDJPY", "CADUSD", "MXNUSD", "USDYUAN"],
+    # Commodity Table
+    "commodities-table": ["Copper", "Gold"],
+}
+
+# horizon buttons on the home page -> (label, trading days)
+HORIZONS = {
+    1: ("1D", 1),
+    2: ("2D", 2),
+    3: ("3D", 3),
+    4: ("5D", 5),
+    5: ("10D", 10),
+    6: ("1M", 21),
+    7: ("2M", 42),
+    8: ("3M", 63),
+    9: ("6M", 126),
+    10: ("1Y", 252),
+}
+
+# cells the live-update callback compares between versions
+DASHBOARD_CELLS = ["Level", "1Wk Δ", "Δ Z-Score"]
+
+# how the Δ Z-Score column is computed:
+#   "normal"     change / std of changes, i.e. assumes normally distributed changes
+#   "empirical"  rank of the change in its own history, as the matching normal quantile
+Z_SCORE_MODES = ["normal", "empirical"]
+
+# how many past (version, mode, horizon) tables are kept to diff a client against
+HISTORY_SIZE = 64
+
+
+def dashboard_columns(label="1Wk"):
+    # the change column keeps its "1Wk Δ" id at every horizon so styles and
+    # patches address it the same way; only the header follows the horizon
+    return [
+        {"name": "", "id": ""},
+        {"name": "Level", "id": "Level"},
+        {"name": f"{label} Δ", "id": "1Wk Δ"},
+        {"name": "Δ Z-Score", "id": "Δ Z-Score"},
+    ]
+
+
+def change_std(macro_df, days=5):
+    return macro_df.diff(days).std()
+
+
+def dashboard_tables(main_df, names, std_df, change_index=None, days=5):
+    df = pd.DataFrame(index=names, columns=["Level", "1Wk Δ", "1Wk Std"])
+
+    for name in names:
+        df.loc[name, "Level"] = main_df[name].tail(1).item()
+
+    for name in names:
+        df.loc[name, "1Wk Δ"] = (
+            df.loc[name, "Level"] - main_df[name][:-days].tail(1).item()
+        )
+
+    for name in names:
+        df.loc[name, "1Wk Std"] = std_df.loc[name]
+
+    if change_index is None:
+        df["Δ Z-Score"] = df["1Wk Δ"] / df["1Wk Std"]
+    else:
+        df["Δ Z-Score"] = [
+            change_index.zscore(name, days, df.loc[name, "1Wk Δ"]) for name in names
+        ]
+
+    df.reset_index(inplace=True)
+    df["Level"] = df["Level"].astype(float).round(decimals=3)
+    df["1Wk Δ"] = df["1Wk Δ"].astype(float).round(decimals=3)
+    df["1Wk Std"] = df["1Wk Std"].astype(float).round(decimals=3)
+    df["Δ Z-Score"] = df["Δ Z-Score"].astype(float).round(decimals=3)
+
+    df = df.drop("1Wk Std", axis=1)
+
+    df = df.rename(columns={"index": ""})
+
+    return df
+
+
+# Versioned dashboard snapshots for the live-update mode
+
+_history = OrderedDict()
+_history_lock = threading.Lock()
+
+
+def build_dashboard(macro_df, mode="normal", days=5):
+    std_df = change_std(macro_df, days)
+    change_index = None
+    if mode == "empirical":
+        change_index = get_change_index([days for _, days in HORIZONS.values()])
+
+    return {
+        table_id: dashboard_tables(macro_df, names, std_df, change_index, days)
+        for table_id, names in DASHBOARD_TABLES.items()
+    }
+
+
+def get_dashboard(version=None, mode="normal", days=5):
+    # tables for the given version, or for the current snapshot if omitted.
+    # returns (version, {table_id: records}); records are None if the version
+    # has aged out of the history
+    if version is None:
+        version, macro_df = get_macro_snapshot()
+    else:
+        macro_df = None
+
+    with _history_lock:
+        if (version, mode, days) in _history:
+            _history.move_to_end((version, mode, days))
+            return version, _history[(version, mode, days)]
+
+    if macro_df is None:
+        return version, None
+
+    records = {
+        table_id: table.to_dict("records")
+        for table_id, table in build_dashboard(macro_df, mode, days).items()
+    }
+
+    with _history_lock:
+        _history[(version, mode, days)] = records
+        while len(_history) > HISTORY_SIZE:
+            _history.popitem(last=False)
+
+    return version, records
+
+
+def _same_cell(old, new):
+    if old is None or new is None:
+        return old is new
+    return old == new or (np.isnan(old) and np.isnan(new))
+
+
+def dashboard_deltas(old_records, new_records):
+    # {table_id: [(row, column, value), ...]} for every cell that moved between
+    # two versions of the dashboard; tables with no changes are left out and
+    # tables whose shape changed map to None so they are resent whole
+    deltas = {}
+    for table_id, rows in new_records.items():
+        old_rows = old_records.get(table_id)
+        if old_rows is None or len(old_rows) != len(rows):
+            deltas[table_id] = None
+            continue
+
+        changed = [
+            (i, column, row[column])
+            for i, (old_row, row) in enumerate(zip(old_rows, rows))
+            for column in DASHBOARD_CELLS
+            if not _same_cell(old_row.get(column), row.get(column))
+        ]
+        if changed:
+            deltas[table_id] = changed
+
+    return deltas
@@ -0,0 +1,154 @@
+# Forward moves after historical Δ Z-Score breaches
+import threading
+
+import numpy as np
+import pandas as pd
+
+from dashboard import HORIZONS
+
+
+# forward windows, in trading days, measured after each signal
+FORWARD_DAYS = [1, 5, 21, 63]
+
+# the dashboard's colour bands
+THRESHOLDS = [1.0, 2.0]
+
+# changes needed before a z-score is trusted as a signal
+MIN_HISTORY = 252
+
+RESULT_COLUMNS = [
+    "Signal",
+    "Horizon",
+    "Direction",
+    "Forward",
+    "Series",
+    "Events",
+    "Mean Move",
+    "Mean Move Z",
+    "Hit Rate",
+    "t-Stat",
+]
+
+
+def backward_changes(values, days):
+    # change over the trailing `days` rows, aligned on the row it ends at
+    changes = np.full(values.shape, np.nan)
+    changes[days:] = values[days:] - values[:-days]
+    return changes
+
+
+def forward_changes(values, days):
+    # change over the next `days` rows, aligned on the row it starts from
+    changes = np.full(values.shape, np.nan)
+    changes[:-days] = values[days:] - values[:-days]
+    return changes
+
+
+def breach_entries(breached):
+    # first day of every run of consecutive breaches, so a signal that stays on
+    # for a week counts as one event rather than five overlapping ones
+    entries = breached.copy()
+    entries[1:] &= ~breached[:-1]
+    return entries
+
+
+def signal_zscores(values, days, min_history=MIN_HISTORY):
+    # the dashboard's Δ Z-Score, but scaled by the expanding std of the changes
+    # seen up to each day rather than the full-history std, so whether a day
+    # breached doesn't depend on volatility that came after it
+    changes = backward_changes(values, days)
+    valid = ~np.isnan(changes)
+    filled = np.where(valid, changes, 0.0)
+
+    count = np.cumsum(valid, axis=0)
+    total = np.cumsum(filled, axis=0)
+    squares = np.cumsum(filled**2, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        var = (squares - total**2 / count) / (count - 1)
+        z = changes / np.sqrt(np.maximum(var, 0))
+
+    z[count < min_history] = np.nan
+    return z
+
+
+def event_study(macro_df, series=None, horizons=None, forward_days=FORWARD_DAYS, threshold=2.0):
+    # every |z| breach of every series and horizon against the forward move of
+    # every series. events are stacked into a (days x signals) 0/1 matrix so each
+    # forward window is a handful of matrix products rather than a loop over
+    # individual events
+    if series is None:
+        series = list(macro_df.select_dtypes("number").columns)
+    if horizons is None:
+        horizons = [days for _, days in HORIZONS.values()]
+
+    values = macro_df[series].to_numpy(dtype=np.float64)
+    n_series = len(series)
+
+    signals = []
+    labels = []
+    for days in horizons:
+        z = signal_zscores(values, days)
+        with np.errstate(invalid="ignore"):
+            signals.append(breach_entries(z >= threshold))
+            signals.append(breach_entries(z <= -threshold))
+        labels += [(name, days, "Up") for name in series]
+        labels += [(name, days, "Down") for name in series]
+
+    events = np.concatenate(signals, axis=1).astype(np.float64)
+
+    frames = []
+    for days in forward_days:
+        moves = forward_changes(values, days)
+        valid = ~np.isnan(moves)
+        moves = np.where(valid, moves, 0.0)
+
+        counts = events.T @ valid
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = (events.T @ moves) / counts
+            var = (events.T @ moves**2) / counts - mean**2
+            hit_rate = (events.T @ (moves > 0)) / counts
+            t_stat = mean / np.sqrt(var / (counts - 1))
+
+        move_std = np.nanstd(np.where(valid, moves, np.nan), axis=0, ddof=1)
+
+        frames.append(
+            pd.DataFrame(
+                {
+                    "Signal": np.repeat([label[0] for label in labels], n_series),
+                    "Horizon": np.repeat([label[1] for label in labels], n_series),
+                    "Direction": np.repeat([label[2] for label in labels], n_series),
+                    "Forward": days,
+                    "Series": np.tile(series, len(labels)),
+                    "Events": counts.ravel().astype(int),
+                    "Mean Move": mean.ravel(),
+                    "Mean Move Z": (mean / move_std).ravel(),
+                    "Hit Rate": hit_rate.ravel(),
+                    "t-Stat": t_stat.ravel(),
+                }
+            )
+        )
+
+    results = pd.concat(frames, ignore_index=True)
+    return results.loc[results["Events"] > 0, RESULT_COLUMNS].reset_index(drop=True)
+
+
+# Results per data version, shared by every user of the page
+
+_results = {}
+_results_lock = threading.Lock()
+
+
+def get_event_study(version, macro_df, threshold):
+    key = (version, threshold)
+    with _results_lock:
+        if key in _results:
+            return _results[key]
+
+    results = event_study(macro_df, threshold=threshold)
+
+    with _results_lock:
+        for stale in [k for k in _results if k[0] != version]:
+            del _results[stale]
+        _results[key] = results
+
+    return results
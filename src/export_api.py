@@ -0,0 +1,167 @@
+# Bulk export of macro history and dashboard tables
+import io
+import json
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from flask import Blueprint, Response, abort, request, stream_with_context
+
+from dashboard import DASHBOARD_TABLES, get_dashboard
+from macro_data import get_data_quality, get_macro_snapshot
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow output is only offered when pyarrow is installed
+    pa = None
+
+
+export_api = Blueprint("export_api", __name__, url_prefix="/api")
+
+# rows serialized per streamed chunk
+CHUNK_ROWS = 2000
+
+MIMETYPES = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def _etag(version):
+    # the snapshot version plus the normalized query, so every filter and
+    # format of the same snapshot gets its own tag
+    query = json.dumps(sorted(request.args.items(multi=True)))
+    return hashlib.sha1(f"{version}{request.path}{query}".encode()).hexdigest()
+
+
+def _chunks(df):
+    for start in range(0, len(df), CHUNK_ROWS):
+        yield df.iloc[start:start + CHUNK_ROWS]
+
+
+def _stream_csv(df):
+    for i, chunk in enumerate(_chunks(df)):
+        yield chunk.to_csv(header=i == 0)
+
+
+def _stream_json(df):
+    # one JSON array of records, written a chunk at a time
+    df = df.reset_index()
+    yield "["
+    for i, chunk in enumerate(_chunks(df)):
+        records = chunk.to_json(orient="records", date_format="iso")[1:-1]
+        if records:
+            yield ("," if i else "") + records
+    yield "]"
+
+
+def _stream_arrow(df, schema):
+    buffer = io.BytesIO()
+    writer = pa.ipc.new_stream(buffer, schema)
+
+    def drain():
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    for chunk in _chunks(df):
+        writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False))
+        yield drain()
+    writer.close()
+    yield drain()
+
+
+def _respond(df, version):
+    fmt = request.args.get("format", "csv")
+    if fmt not in MIMETYPES:
+        abort(400, f"format must be one of {', '.join(MIMETYPES)}")
+    if fmt == "arrow" and pa is None:
+        abort(406, "Arrow output needs pyarrow installed on the server")
+
+    etag = _etag(version)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    # anything that can fail happens here, before the 200 is sent
+    if fmt == "arrow":
+        df = df.reset_index()
+        schema = pa.Schema.from_pandas(df, preserve_index=False)
+        stream = _stream_arrow(df, schema)
+    else:
+        stream = {"csv": _stream_csv, "json": _stream_json}[fmt](df)
+
+    response = Response(stream_with_context(stream), mimetype=MIMETYPES[fmt])
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def _parse_date(value):
+    # the index is naive, so a timezone-aware date is converted to UTC and
+    # compared without its zone
+    if not value:
+        return None
+    date = pd.Timestamp(value)
+    if date is pd.NaT:
+        raise ValueError(value)
+    return date.tz_convert(None) if date.tzinfo is not None else date
+
+
+@export_api.route("/macro")
+def export_macro():
+    # ?series=SPX,VIX&start=2020-01-01&end=2020-12-31&format=csv|json|arrow
+    version, df = get_macro_snapshot()
+
+    series = request.args.get("series")
+    if series:
+        names = list(dict.fromkeys(series.split(",")))
+        missing = [name for name in names if name not in df.columns]
+        if missing:
+            abort(404, f"unknown series: {', '.join(missing)}")
+        df = df[names]
+
+    try:
+        start = _parse_date(request.args.get("start"))
+        end = _parse_date(request.args.get("end"))
+    except ValueError:
+        abort(400, "start and end must be dates, e.g. 2020-01-31")
+
+    keep = np.ones(len(df), dtype=bool)
+    if start is not None:
+        keep &= df.index >= start
+    if end is not None:
+        keep &= df.index <= end
+    df = df[keep]
+
+    return _respond(df, version)
+
+
+@export_api.route("/dashboard")
+@export_api.route("/dashboard/<table_id>")
+def export_dashboard(table_id=None):
+    # the home page tables, all of them stacked or a single one by DataTable id
+    version, records = get_dashboard()
+    if table_id is not None and table_id not in DASHBOARD_TABLES:
+        abort(404, f"unknown table: {table_id}")
+
+    tables = [table_id] if table_id is not None else list(DASHBOARD_TABLES)
+    df = pd.concat(
+        [pd.DataFrame(records[t]).assign(table=t) for t in tables], ignore_index=True
+    )
+    df = df.rename(columns={"": "series"}).set_index("table")
+
+    return _respond(df, version)
+
+
+@export_api.route("/quality")
+def export_quality():
+    # per-series data quality of the current snapshot
+    version, _ = get_macro_snapshot()
+    df = get_data_quality().rename_axis("series")
+
+    return _respond(df, version)
@@ -0,0 +1,300 @@
+# Concurrent-user load test for riskboard
+#
+#   python loadtest.py --synthetic --users 1 2 4 8 16 --duration 20
+#   python loadtest.py --url http://127.0.0.1:8050 --users 4 8 16 32
+#
+# Without --url the app is driven in-process through Flask's test client,
+# i.e. one threaded worker process. To find the saturation point of a real
+# worker configuration, start it (e.g. gunicorn -w 4 --threads 2 app:server)
+# and point --url at it.
+# --synthetic points the in-process app at a generated macro_dash.csv so
+# nothing is fetched from S3.
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+import tempfile
+import threading
+import urllib.request
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+
+def write_synthetic_macro_csv(path, years=20, seed=0):
+    # a random-walk stand-in with every column the app reads
+    from macro_data import MACRO_SCHEMA
+
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=years * 261)
+    rng = np.random.default_rng(seed)
+    walks = np.cumsum(rng.standard_t(4, size=(len(dates), len(MACRO_SCHEMA))) * 0.01, axis=0)
+    levels = np.exp(walks) * 100
+    df = pd.DataFrame(levels, index=dates.strftime("%Y-%m-%d"), columns=list(MACRO_SCHEMA))
+    df.to_csv(path)
+
+
+def _outputs(output):
+    # the outputs field of a _dash-update-component payload
+    if output.startswith(".."):
+        return [
+            dict(zip(("id", "property"), part.rsplit(".", 1)))
+            for part in output[2:-2].split("...")
+        ]
+    component, prop = output.rsplit(".", 1)
+    return {"id": component, "property": prop}
+
+
+def _callback_body(dependency, values):
+    # values maps "id.property" to the value sent for that input or state
+    def props(items):
+        return [
+            {"id": item["id"], "property": item["property"],
+             "value": values.get(f"{item['id']}.{item['property']}")}
+            for item in items
+        ]
+
+    inputs = props(dependency["inputs"])
+    return {
+        "output": dependency["output"],
+        "outputs": _outputs(dependency["output"]),
+        "inputs": inputs,
+        "state": props(dependency.get("state", [])),
+        "changedPropIds": [f"{inputs[0]['id']}.{inputs[0]['property']}"],
+    }
+
+
+class InProcessClient:
+    def __init__(self, server, auth_header):
+        self.client = server.test_client()
+        self.headers = {"Authorization": auth_header}
+
+    def get(self, path):
+        response = self.client.get(path, headers=self.headers)
+        return response.status_code, response.get_data()
+
+    def post(self, path, body):
+        response = self.client.post(path, json=body, headers=self.headers)
+        return response.status_code, response.get_data()
+
+
+class HttpClient:
+    def __init__(self, url, auth_header):
+        self.url = url.rstrip("/")
+        self.headers = {"Authorization": auth_header}
+
+    def _send(self, request):
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def get(self, path):
+        return self._send(urllib.request.Request(self.url + path, headers=self.headers))
+
+    def post(self, path, body):
+        headers = {**self.headers, "Content-Type": "application/json"}
+        return self._send(
+            urllib.request.Request(self.url + path, data=json.dumps(body).encode(), headers=headers)
+        )
+
+
+def user_session(client, dependencies, pages):
+    # one simulated visit, as (route, callable) steps: load the shell, then
+    # open every page and fire the callbacks that page's controls trigger
+    steps = [
+        ("GET /", lambda: client.get("/")),
+        ("GET /_dash-layout", lambda: client.get("/_dash-layout")),
+        ("GET /_dash-dependencies", lambda: client.get("/_dash-dependencies")),
+    ]
+
+    router = next(d for d in dependencies if "_pages_content" in d["output"])
+    for path in pages:
+        body = _callback_body(router, {"_pages_location.pathname": path, "_pages_location.search": ""})
+        steps.append((f"page {path}", lambda body=body: client.post("/_dash-update-component", body)))
+
+    for dependency in dependencies:
+        if dependency is router or dependency.get("clientside_function"):
+            continue
+        body = _callback_body(dependency, CALLBACK_VALUES)
+        # labelled by output id and property, since one component can be the
+        # target of several callbacks (e.g. a table's columns and its data)
+        outputs = dependency["output"].strip(".").split("...")
+        name = outputs[0] + (f" +{len(outputs) - 1}" if len(outputs) > 1 else "")
+        steps.append((f"callback {name}", lambda body=body: client.post("/_dash-update-component", body)))
+
+    return steps
+
+
+# input values used when firing each page's callbacks
+CALLBACK_VALUES = {
+    "dashboard-interval.n_intervals": 1,
+    "dashboard-version.data": {"version": "stale", "mode": "normal", "days": 5},
+    "zscore-mode.value": "empirical",
+    "radios.value": 4,
+    "event-signal.value": "VIX",
+    "event-horizon.value": 5,
+    "event-threshold.value": 2.0,
+    "event-direction.value": "Up",
+    "event-forward.value": 5,
+    "stress-portfolio.value": "60/40 Balanced",
+    "stress-window.value": 21,
+    "rates-history-series.value": "10yTreas",
+    "credit-history-series.value": "BAML HY OAS",
+    "vol-history-series.value": "VIX",
+    "rates-history-width.data": 1200,
+    "credit-history-width.data": 1200,
+    "vol-history-width.data": 1200,
+    "commodity-series.value": "Gold",
+    "commodity-view.value": "monthly",
+}
+
+
+def page_paths(layout):
+    # the sidebar's links, found anywhere in the serialized app layout
+    paths = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            href = node.get("props", {}).get("href") if isinstance(node.get("props"), dict) else None
+            if href and href not in paths:
+                paths.append(href)
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(layout)
+    return paths or ["/"]
+
+
+def run_level(make_client, dependencies, pages, users, duration):
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def simulate():
+        client = make_client()
+        while time.perf_counter() < stop_at:
+            for route, step in user_session(client, dependencies, pages):
+                start = time.perf_counter()
+                status, _ = step()
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies[route].append(elapsed)
+                    if status >= 400:
+                        errors[route] += 1
+                if time.perf_counter() >= stop_at:
+                    break
+
+    threads = [threading.Thread(target=simulate) for _ in range(users)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    rows = []
+    for route, times in sorted(latencies.items()):
+        times = np.array(times) * 1000
+        rows.append({
+            "users": users,
+            "route": route,
+            "requests": len(times),
+            "errors": errors[route],
+            "rps": len(times) / elapsed,
+            "p50_ms": np.percentile(times, 50),
+            "p99_ms": np.percentile(times, 99),
+        })
+    all_times = np.concatenate([np.array(t) for t in latencies.values()]) * 1000
+    total = {
+        "users": users,
+        "requests": len(all_times),
+        "errors": sum(errors.values()),
+        "rps": len(all_times) / elapsed,
+        "p50_ms": np.percentile(all_times, 50),
+        "p99_ms": np.percentile(all_times, 99),
+    }
+    return pd.DataFrame(rows), total
+
+
+def saturation_point(totals, gain=1.1):
+    # the concurrency past which adding users stops adding at least `gain`x
+    # throughput, i.e. where requests start queueing instead of being served
+    for previous, current in zip(totals, totals[1:]):
+        if current["rps"] < previous["rps"] * gain:
+            return previous["users"]
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-user load test for riskboard")
+    parser.add_argument("--url", help="running riskboard to test; default is in-process")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--duration", type=float, default=20, help="seconds per concurrency level")
+    parser.add_argument("--synthetic", action="store_true", help="serve a generated macro_dash.csv")
+    parser.add_argument("--username", default="root")
+    parser.add_argument("--password", default="root")
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        import macro_data
+
+        path = os.path.join(tempfile.mkdtemp(), "macro_dash.csv")
+        write_synthetic_macro_csv(path)
+        macro_data.MACRO_URL = path
+    os.environ.setdefault("RISKBOARD_ALERTS", "0")
+
+    credentials = base64.b64encode(f"{args.username}:{args.password}".encode()).decode()
+    auth_header = f"Basic {credentials}"
+
+    if args.url:
+        def make_client():
+            return HttpClient(args.url, auth_header)
+    else:
+        from app import server
+
+        def make_client():
+            return InProcessClient(server, auth_header)
+
+    client = make_client()
+    status, body = client.get("/_dash-dependencies")
+    if status != 200:
+        sys.exit(f"could not load callbacks ({status}); check the credentials")
+    dependencies = json.loads(body)
+    pages = page_paths(json.loads(client.get("/_dash-layout")[1]))
+
+    # one untimed pass so the first level doesn't pay for loading the data
+    for _, step in user_session(make_client(), dependencies, pages):
+        step()
+
+    tables, totals = [], []
+    for users in args.users:
+        table, total = run_level(make_client, dependencies, pages, users, args.duration)
+        tables.append(table)
+        totals.append(total)
+        print(
+            f"{users:>4} users  {total['rps']:8.1f} req/s  p50 {total['p50_ms']:8.1f} ms  "
+            f"p99 {total['p99_ms']:8.1f} ms  errors {total['errors']}"
+        )
+
+    with pd.option_context("display.width", 200, "display.max_rows", None):
+        print()
+        print(pd.concat(tables).round(1).to_string(index=False))
+
+    saturated = saturation_point(totals)
+    print()
+    if saturated is None:
+        print("throughput still rising at the highest concurrency tested")
+    else:
+        print(f"saturation at ~{saturated} concurrent users")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+# Typed loading, quality checks and the shared snapshot of macro_dash.csv
+import os
+import time
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+
+MACRO_URL = os.environ.get(
+    "RISKBOARD_MACRO_URL", "https://nacey-capstone.s3.amazonaws.com/macro_dash.csv"
+)
+
+# seconds a loaded snapshot is served before macro_dash.csv is fetched again
+REFRESH_SECONDS = int(os.environ.get("RISKBOARD_REFRESH_SECONDS", 300))
+
+# first wait after a failed fetch; doubles with each failure up to REFRESH_SECONDS
+RETRY_SECONDS = 10
+
+# column -> (dtype, scale applied on load). float32 keeps 7 significant
+# digits, plenty for yields, spreads, vols and FX; equity index levels run
+# into the tens of thousands and stay float64 so 3dp changes are exact
+MACRO_SCHEMA = {
+    # Rates
+    "2yTreas": ("float32", 1),
+    "5yTreas": ("float32", 1),
+    "10yTreas": ("float32", 1),
+    "30yTreas": ("float32", 1),
+    "30yr Mortgage": ("float32", 1),
+    "2s10s": ("float32", 1),
+    "2s30s": ("float32", 1),
+    "5s30s": ("float32", 1),
+    "5y5yILBE": ("float32", 1),
+    "5yrReal": ("float32", 1),
+    # Equities
+    "SPX": ("float64", 1),
+    "NASDAQ": ("float64", 1),
+    "Russell": ("float64", 1),
+    "FTSE": ("float64", 1),
+    "DAX": ("float64", 1),
+    "CAC40": ("float64", 1),
+    "Nikkei": ("float64", 1),
+    "Shenzen": ("float64", 1),
+    "Hang Seng": ("float64", 1),
+    "VIX": ("float32", 1),
+    "VVIX": ("float32", 1),
+    "VXN": ("float32", 1),
+    # Credit, OAS in % on file and shown in bp
+    "BAML IG OAS": ("float32", 100),
+    "BAML HY OAS": ("float32", 100),
+    "BBB OAS": ("float32", 100),
+    "BB OAS": ("float32", 100),
+    "B OAS": ("float32", 100),
+    "CCC OAS": ("float32", 100),
+    # FX
+    "EURUSD": ("float32", 1),
+    "USDGBP": ("float32", 1),
+    "CHFUSD": ("float32", 1),
+    "USDJPY": ("float32", 1),
+    "CADUSD": ("float32", 1),
+    "MXNUSD": ("float32", 1),
+    "USDYUAN": ("float32", 1),
+    # Commodities
+    "Copper": ("float32", 1),
+    "Gold": ("float32", 1),
+}
+
+# the csv's first, unnamed column holds the dates
+DATE_COLUMN = "Unnamed: 0"
+
+# data quality checks
+STALE_DAYS = 5
+OUTLIER_Z = 15.0
+
+
+def load_macro_df(url=None, schema=MACRO_SCHEMA):
+    # one pass over the csv: only schema columns are parsed, straight into
+    # their dtypes, with the dates as a DatetimeIndex
+    if url is None:
+        url = MACRO_URL
+    macro_df = pd.read_csv(
+        url,
+        usecols=lambda c: c == DATE_COLUMN or c in schema,
+        index_col=0,
+        parse_dates=True,
+        dtype={name: dtype for name, (dtype, _) in schema.items()},
+    )
+    macro_df.index.name = "date"
+
+    scaled = [name for name, (_, scale) in schema.items() if scale != 1 and name in macro_df]
+    if scaled:
+        scales = np.array([schema[name][1] for name in scaled])
+        macro_df[scaled] = (macro_df[scaled] * scales).astype(
+            {name: schema[name][0] for name in scaled}
+        )
+
+    return macro_df
+
+
+def validate_macro_df(macro_df, stale_days=STALE_DAYS, outlier_z=OUTLIER_Z):
+    # per-series data quality, computed over every column at once:
+    # missing values, how long the latest value has gone unchanged, and daily
+    # moves more than outlier_z robust (median/MAD) deviations from typical
+    values = macro_df.to_numpy(dtype=np.float64)
+    present = ~np.isnan(values)
+    rows = len(values)
+
+    moves = np.diff(values, axis=0)
+    changed = np.zeros(values.shape, dtype=bool)
+    changed[0] = present[0]
+    changed[1:] = (moves != 0) & present[1:]
+    has_change = changed.any(axis=0)
+    last_change = rows - 1 - np.argmax(changed[::-1], axis=0)
+    unchanged_for = np.where(has_change, rows - 1 - last_change, rows)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        median = np.nanmedian(moves, axis=0)
+        mad = np.nanmedian(np.abs(moves - median), axis=0) * 1.4826
+        outliers = (np.abs(moves - median) / mad > outlier_z).sum(axis=0)
+
+    has_data = present.any(axis=0)
+    first_valid = np.where(has_data, np.argmax(present, axis=0), rows)
+    last_valid = np.where(has_data, rows - 1 - np.argmax(present[::-1], axis=0), 0)
+
+    # a series that starts after the file does isn't missing those early rows,
+    # so gaps are counted from each series' first observation on
+    observed = np.arange(rows)[:, None] >= first_valid
+    missing = (~present & observed).sum(axis=0)
+    span = rows - first_valid
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        missing_pct = np.where(span > 0, missing / span * 100, 100.0)
+
+    quality = pd.DataFrame(
+        {
+            "leading_gap": first_valid,
+            "missing": missing,
+            "missing_pct": missing_pct,
+            "last_valid": macro_df.index[last_valid],
+            "unchanged_days": unchanged_for,
+            "outliers": outliers,
+        },
+        index=macro_df.columns,
+    )
+    quality["stale"] = quality["unchanged_days"] >= stale_days
+    # outliers are reported for review but fat-tailed series legitimately
+    # have some, so they don't fail a series on their own
+    quality["ok"] = ~quality["stale"] & (quality["missing_pct"] < 5)
+
+    return quality
+
+
+def memory_report(url=None):
+    # bytes held by a plain pd.read_csv against the schema loader
+    if url is None:
+        url = MACRO_URL
+    naive = pd.read_csv(url).memory_usage(deep=True).sum()
+    typed = load_macro_df(url).memory_usage(deep=True).sum()
+    return {"read_csv_bytes": int(naive), "schema_bytes": int(typed), "saved_pct": 100 * (1 - typed / naive)}
+
+
+def data_version(macro_df):
+    # the version only moves when the content does, so clients holding an
+    # unchanged snapshot are never sent anything
+    return format(int(pd.util.hash_pandas_object(macro_df).sum()) & (2**64 - 1), "016x")
+
+
+# Shared snapshot of macro_dash.csv
+
+_snapshot = {
+    "version": None,
+    "df": None,
+    "quality": None,
+    "loaded_at": 0.0,
+    "loading": False,
+    "failures": 0,
+    "retry_at": 0.0,
+}
+_snapshot_lock = threading.Lock()
+_snapshot_loaded = threading.Condition(_snapshot_lock)
+_listeners = []
+
+
+def on_refresh(listener):
+    # listener(previous_df, macro_df, version, arrived_at) runs after every
+    # load that produced a new version; previous_df is None on the first load
+    _listeners.append(listener)
+    return listener
+
+
+def _reload():
+    # fetches and installs a new snapshot; runs outside the lock in the one
+    # thread that claimed the reload. Returns the listener arguments when the
+    # version moved, else None
+    try:
+        macro_df = load_macro_df()
+    except Exception:
+        with _snapshot_loaded:
+            _snapshot["failures"] += 1
+            backoff = min(RETRY_SECONDS * 2 ** (_snapshot["failures"] - 1), REFRESH_SECONDS)
+            _snapshot["retry_at"] = time.time() + backoff
+            _snapshot["loading"] = False
+            _snapshot_loaded.notify_all()
+        raise
+
+    arrived_at = time.time()
+    version = data_version(macro_df)
+    # only this thread writes the snapshot, so reading the version unlocked is safe
+    changed = version != _snapshot["version"]
+    quality = validate_macro_df(macro_df) if changed else _snapshot["quality"]
+    if changed:
+        flagged = list(quality.index[~quality["ok"]])
+        if flagged:
+            logger.warning("macro data quality issues in: %s", ", ".join(flagged))
+
+    with _snapshot_loaded:
+        refreshed = (_snapshot["df"], macro_df, version, arrived_at) if changed else None
+        _snapshot.update(
+            version=version,
+            df=macro_df,
+            quality=quality,
+            loaded_at=arrived_at,
+            loading=False,
+            failures=0,
+            retry_at=0.0,
+        )
+        _snapshot_loaded.notify_all()
+
+    return refreshed
+
+
+def get_macro_snapshot():
+    # the current (version, frame). The fetch runs in whichever caller finds
+    # the snapshot due, without holding the lock, so every other request keeps
+    # being served the last good snapshot meanwhile, and after a failed fetch
+    # until the backoff has passed
+    with _snapshot_loaded:
+        while _snapshot["df"] is None and _snapshot["loading"]:
+            _snapshot_loaded.wait()
+
+        now = time.time()
+        due = _snapshot["df"] is None or (
+            now - _snapshot["loaded_at"] > REFRESH_SECONDS and now >= _snapshot["retry_at"]
+        )
+        claimed = due and not _snapshot["loading"]
+        if claimed:
+            _snapshot["loading"] = True
+        current = _snapshot["version"], _snapshot["df"]
+
+    if not claimed:
+        return current
+
+    try:
+        refreshed = _reload()
+    except Exception:
+        if current[1] is None:
+            raise
+        logger.exception("macro data reload failed; still serving version %s", current[0])
+        return current
+
+    if refreshed is not None:
+        for listener in _listeners:
+            try:
+                listener(*refreshed)
+            except Exception:
+                logger.exception("macro refresh listener %r failed", listener)
+
+    with _snapshot_lock:
+        return _snapshot["version"], _snapshot["df"]
+
+
+def get_data_quality():
+    get_macro_snapshot()
+    return _snapshot["quality"]
+
+
+def only_appended(previous_df, macro_df, columns=None):
+    # True when macro_df is previous_df with rows added at the end, so caches
+    # built on previous_df can be extended instead of rebuilt
+    if previous_df is None or len(macro_df) < len(previous_df):
+        return False
+    if columns is None:
+        columns = list(previous_df.columns)
+        if list(macro_df.columns) != columns:
+            return False
+
+    rows = len(previous_df)
+    return macro_df.index[:rows].equals(previous_df.index) and np.array_equal(
+        macro_df[columns].iloc[:rows].to_numpy(dtype=np.float64),
+        previous_df[columns].to_numpy(dtype=np.float64),
+        equal_nan=True,
+    )
+
+
+def touched_series(previous_df, macro_df):
+    # numeric columns whose history changed or gained rows between two loads
+    columns = list(macro_df.select_dtypes("number").columns)
+    if previous_df is None:
+        return columns
+
+    rows = min(len(previous_df), len(macro_df))
+    touched = []
+    for name in columns:
+        if name not in previous_df or len(macro_df) < len(previous_df):
+            touched.append(name)
+            continue
+        old = previous_df[name].to_numpy(dtype=np.float64)
+        new = macro_df[name].to_numpy(dtype=np.float64)
+        if not np.array_equal(old[:rows], new[:rows], equal_nan=True) or not np.isnan(new[rows:]).all():
+            touched.append(name)
+
+    return touched
+
+
+_refresher = {"thread": None}
+
+
+def start_refresher(interval=REFRESH_SECONDS):
+    # reloads the snapshot on a timer so refresh listeners run even when no
+    # one has the dashboard open
+    def refresh_forever():
+        while True:
+            try:
+                get_macro_snapshot()
+            except Exception:
+                logger.exception("macro snapshot refresh failed")
+            time.sleep(interval)
+
+    with _snapshot_lock:
+        if _refresher["thread"] is None:
+            _refresher["thread"] = threading.Thread(
+                target=refresh_forever, name="macro-refresh", daemon=True
+            )
+            _refresher["thread"].start()
@@ -0,0 +1,160 @@
+# Data manipulation libraries
+import numpy as np
+
+# Dashboard-related libraries
+import dash
+from dash import dcc, html, Input, Output
+import dash_bootstrap_components as dbc
+from dash import dash_table
+from dash import callback
+
+
+# Data visualization libraries
+import plotly.graph_objects as go
+
+from dashboard import HORIZONS
+from event_study import FORWARD_DAYS, THRESHOLDS, get_event_study
+from macro_data import get_macro_snapshot
+from callback_cache import memoize_callback
+
+dash.register_page(
+    __name__,
+    order=7,
+    title='Event Study',
+    name='Event Study'
+)
+
+
+def serve_layout():
+    _, macro_df = get_macro_snapshot()
+    series = list(macro_df.select_dtypes("number").columns)
+
+    layout = html.Div(children=[
+        html.Br(),
+        html.Center(html.H3('Z-Score Event Study')),
+        html.Hr(),
+        html.Center(html.Div(
+            """Every historical breach of the dashboard's Δ Z-Score bands, for every series and
+            horizon, and the average move in each series over the following days. Each day's
+            z-score uses only the history up to that day (expanding std, from one year of
+            data on), so no event depends on later volatility."""
+        )),
+        html.P(),
+        dbc.Row(children=[
+            dbc.Col(dcc.Dropdown(
+                id='event-signal',
+                options=series,
+                value=series[0],
+                clearable=False,
+            ), width=3),
+            dbc.Col(dcc.Dropdown(
+                id='event-horizon',
+                options=[{"label": label, "value": days} for label, days in HORIZONS.values()],
+                value=5,
+                clearable=False,
+            ), width=2),
+            dbc.Col(dbc.RadioItems(
+                id='event-threshold',
+                className="btn-group",
+                inputClassName="btn-check",
+                labelClassName="btn btn-outline-primary",
+                labelCheckedClassName="active",
+                options=[{"label": f"|z| > {t:g}", "value": t} for t in THRESHOLDS],
+                value=THRESHOLDS[-1],
+            ), width=3),
+            dbc.Col(dbc.RadioItems(
+                id='event-direction',
+                className="btn-group",
+                inputClassName="btn-check",
+                labelClassName="btn btn-outline-primary",
+                labelCheckedClassName="active",
+                options=["Up", "Down"],
+                value="Up",
+            ), width=2),
+            dbc.Col(dcc.Dropdown(
+                id='event-forward',
+                options=[{"label": f"{days}D fwd", "value": days} for days in FORWARD_DAYS],
+                value=FORWARD_DAYS[1],
+                clearable=False,
+            ), width=2),
+        ]),
+        html.P(),
+        html.Div(id='event-summary'),
+        dcc.Graph(id='event-graph'),
+        dash_table.DataTable(
+            id='event-table',
+            sort_action="native",
+            style_cell=dict(
+                textAlign="right",
+                font_family="sans-serif",
+                padding="3px",
+                border="none",
+            ),
+            style_header=dict(
+                backgroundColor="#005999",
+                font_family="sans-serif",
+                color="white",
+                border="none",
+            ),
+            style_data=dict(
+                backgroundColor="#4e5d6c",
+                font_family="sans-serif",
+                color="white",
+                border="none",
+            ),
+            style_data_conditional=[
+                {
+                    "if": {"column_id": "t-Stat", "filter_query": "{t-Stat} > 2"},
+                    "backgroundColor": "green",
+                },
+                {
+                    "if": {"column_id": "t-Stat", "filter_query": "{t-Stat} < -2"},
+                    "backgroundColor": "red",
+                },
+            ],
+        ),
+    ])
+
+    return layout
+
+layout = serve_layout
+
+
+@callback(
+    Output('event-summary', 'children'),
+    Output('event-graph', 'figure'),
+    Output('event-table', 'columns'),
+    Output('event-table', 'data'),
+    Input('event-signal', 'value'),
+    Input('event-horizon', 'value'),
+    Input('event-threshold', 'value'),
+    Input('event-direction', 'value'),
+    Input('event-forward', 'value'),
+)
+@memoize_callback
+def update_event_study(signal, horizon, threshold, direction, forward):
+    version, macro_df = get_macro_snapshot()
+    results = get_event_study(version, macro_df, threshold)
+
+    df = results[
+        (results["Signal"] == signal)
+        & (results["Horizon"] == horizon)
+        & (results["Direction"] == direction)
+    ]
+    own = df[df["Series"] == signal].set_index("Forward")
+
+    events = int(own["Events"].max()) if len(own) else 0
+    summary = html.Center(html.P(f"{events} {direction.lower()} breaches of {signal} over {horizon}D"))
+
+    fig = go.Figure(go.Bar(x=[f"{days}D" for days in own.index], y=own["Mean Move"]))
+    fig.update_layout(
+        template="plotly_dark",
+        title=f"{signal}: mean forward move after signal",
+        height=300,
+    )
+
+    table = df[df["Forward"] == forward].drop(["Signal", "Horizon", "Direction"], axis=1)
+    table = table.sort_values("t-Stat", key=np.abs, ascending=False).round(3)
+    columns = [{"name": i, "id": i} for i in table.columns]
+
+    return summary, fig, columns, table.to_dict("records")
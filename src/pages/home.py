@@ -10,6 +10,7 @@ from dash import dcc, html, Input, Output, State
 import dash_bootstrap_components as dbc
 import dash_auth
 from dash import dash_table
+from dash import callback, no_update, Patch
 
 
 # Data visualization libraries
@@ -18,91 +19,43 @@ import plotly.express as px
 from plotly.subplots import make_subplots
 import plotly.io as pio
 
-dash.register_page(__name__, path="/", order=1)
-
-
-
-
-def serve_layout():
-    macro_df = pd.read_csv("https://nacey-capstone.s3.amazonaws.com/macro_dash.csv")
-    macro_df["BBB OAS"] = macro_df["BBB OAS"] * 100
-    macro_df["CCC OAS"] = macro_df["CCC OAS"] * 100
-    macro_df["BB OAS"] = macro_df["BB OAS"] * 100
-    macro_df["B OAS"] = macro_df["B OAS"] * 100
-    macro_df["BAML IG OAS"] = macro_df["BAML IG OAS"] * 100
-    macro_df["BAML HY OAS"] = macro_df["BAML HY OAS"] * 100
-
-    std_df = macro_df.drop(["Unnamed: 0"], axis=1).diff(5).describe().T["std"]
-
-
-    def dashboard_tables(main_df, names, std_df=std_df):
-        df = pd.DataFrame(index=names, columns=["Level", "1Wk Δ", "1Wk Std"])
-
-        for name in names:
-            df.loc[name]["Level"] = main_df[name].tail(1).item()
+from dashboard import DASHBOARD_TABLES, HORIZONS, dashboard_columns, get_dashboard, dashboard_deltas
 
-        for name in names:
-            df.loc[name]["1Wk Δ"] = (
-                df.loc[name]["Level"] - main_df[name][:-5].tail(1).item()
-            )
-
-        for name in names:
-            df.loc[name]["1Wk Std"] = std_df.loc[name]
-
-        df["Δ Z-Score"] = df["1Wk Δ"] / df["1Wk Std"]
+dash.register_page(__name__, path="/", order=1)
 
-        df.reset_index(inplace=True)
-        df["Level"] = df["Level"].astype(float).round(decimals=3)
-        df["1Wk Δ"] = df["1Wk Δ"].astype(float).round(decimals=3)
-        df["1Wk Std"] = df["1Wk Std"].astype(float).round(decimals=3)
-        df["Δ Z-Score"] = df["Δ Z-Score"].astype(float).round(decimals=3)
+# how often the open dashboard polls for changed cells
+LIVE_UPDATE_MS = 60 * 1000
 
-        df = df.drop("1Wk Std", axis=1)
 
-        df = df.rename(columns={"index": ""})
 
-        return df
 
+def serve_layout():
+    version, tables = get_dashboard()
 
     # Rates Tables
-    treas_rates_table = dashboard_tables(
-        macro_df, ["2yTreas", "5yTreas", "10yTreas", "30yTreas", "30yr Mortgage"]
-    )
-    curve_rates_table = dashboard_tables(macro_df, ["2s10s", "2s30s", "5s30s"])
-    ilbe_rates_table = dashboard_tables(macro_df, ["5y5yILBE", "5yrReal"])
+    treas_rates_table = tables["treas-rates-table"]
+    curve_rates_table = tables["curve-rates-table"]
+    ilbe_rates_table = tables["ilbe-rates-table"]
 
     # Equity Tables
-    equity_indices_table = dashboard_tables(
-        macro_df,
-        [
-            "SPX",
-            "NASDAQ",
-            "Russell",
-            "FTSE",
-            "DAX",
-            "CAC40",
-            "Nikkei",
-            "Shenzen",
-            "Hang Seng",
-        ],
-    )
+    equity_indices_table = tables["equity-indices-table"]
 
-    vol_table = dashboard_tables(macro_df, ["VIX", "VVIX", "VXN"])
+    vol_table = tables["vol-table"]
 
     # US Credit Tables
-    baml_rates_table = dashboard_tables(macro_df, ["BAML IG OAS", "BAML HY OAS"])
-    corp_rates_table = dashboard_tables(macro_df, ["BBB OAS", "BB OAS", "B OAS", "CCC OAS"])
+    baml_rates_table = tables["baml-rates-table"]
+    corp_rates_table = tables["corp-rates-table"]
 
     # FX Table
-    currency_table = dashboard_tables(
-        macro_df, ["EURUSD", "USDGBP", "CHFUSD", "USDJPY", "CADUSD", "MXNUSD", "USDYUAN"]
-    )
+    currency_table = tables["currency-table"]
 
     # Commodity Table
-    commodities_table = dashboard_tables(macro_df, ["Copper", "Gold"])
+    commodities_table = tables["commodities-table"]
 
     layout = html.Div(
         children=[
+            dcc.Interval(id="dashboard-interval", interval=LIVE_UPDATE_MS),
+            dcc.Store(id="dashboard-version", data={"version": version, "mode": "normal", "days": 5}),
             html.P(),
             dbc.Row(
                 html.Center(html.H3("Volatility-Adjusted Macro Dashboard")),
@@ -136,11 +89,26 @@ def serve_layout():
                             {"label": "6M", "value": 9},
                             {"label": "1Y", "value": 10},
                         ],
-                    value=1,),
+                    value=4,),
                 html.Div(id="output"),
             ],
             className="radio-group")),
             html.P(" "),
+            html.Center(html.Div([
+                dbc.RadioItems(
+                        id="zscore-mode",
+                        className="btn-group",
+                        inputClassName="btn-check",
+                        labelClassName="btn btn-outline-primary",
+                        labelCheckedClassName="active",
+                        options=[
+                            {"label": "Normal Z", "value": "normal"},
+                            {"label": "Empirical Z", "value": "empirical"},
+                        ],
+                    value="normal",),
+            ],
+            className="radio-group")),
+            html.P(" "),
             dbc.Row(
                 children=[
                     dbc.Col(children=[html.Center(html.Div("Rates"))], width=3),
@@ -156,11 +124,12 @@ def serve_layout():
                             html.Center(html.Div("US Treasuries")),
                             html.P(),
                             dash_table.DataTable(
+                                id="treas-rates-table",
                                 columns=[
                                     {"name": i, "id": i}
-                                    for i in treas_rates_table.columns
+                                    for i in treas_rates_table[0]
                                 ],
-                                data=treas_rates_table.to_dict("records"),
+                                data=treas_rates_table,
                                 style_cell=dict(
                                     textAlign="right",
                                     font_family="sans-serif",
@@ -214,11 +183,12 @@ def serve_layout():
                             html.P(),
                             html.Center(html.P("US Treasury Curve")),
                             dash_table.DataTable(
+                                id="curve-rates-table",
                                 columns=[
                                     {"name": i, "id": i}
-                                    for i in curve_rates_table.columns
+                                    for i in curve_rates_table[0]
                                 ],
-                                data=curve_rates_table.to_dict("records"),
+                                data=curve_rates_table,
                                 style_cell=dict(
                                     textAlign="right",
                                     font_family="sans-serif",
@@ -272,11 +242,12 @@ def serve_layout():
                             html.P(),
                             html.Center(html.P("Inflation & Real Rates")),
                             dash_table.DataTable(
+                                id="ilbe-rates-table",
                                 columns=[
                                     {"name": i, "id": i}
-                                    for i in ilbe_rates_table.columns
+                                    for i in ilbe_rates_table[0]
                                 ],
-                                data=ilbe_rates_table.to_dict("records"),
+                                data=ilbe_rates_table,
                                 style_cell=dict(
                                     textAlign="right",
                                     font_family="sans-serif",
@@ -335,11 +306,12 @@ def serve_layout():
                             html.Center(html.Div("Global")),
                             html.P(),
                             dash_table.DataTable(
+                                id="equity-indices-table",
                                 columns=[
                                     {"name": i, "id": i}
-                                    for i in equity_indices_table.columns
+                                    for i in equity_indices_table[0]
                                 ],
-                                data=equity_indices_table.to_dict("records"),
+                                data=equity_indices_table,
                                 style_cell=dict(
                                     textAlign="right",
                                     font_family="sans-serif",
@@ -393,10 +365,11 @@ def serve_layout():
                             html.P(),
                             html.Center(html.P("Volatility")),
                             dash_table.DataTable(
+                                id="vol-table",
                                 columns=[
-                                    {"name": i, "id": i} for i in vol_table.columns
+                                    {"name": i, "id": i} for i in vol_table[0]
                                 ],
-                                data=vol_table.to_dict("records"),
+                                data=vol_table,
                                 style_cell=dict(
                                     textAlign="right",
                                     font_family="sans-serif",
@@ -455,11 +428,12 @@ def serve_layout():
                             html.Center(html.Div("US")),
                             html.P(),
                             dash_table.DataTable(
+                                id="baml-rates-table",
                                 columns=[
                                     {"name": i, "id": i}
-                                    for i in baml_rates_table.columns
+                                    for i in baml_rates_table[0]
                                 ],
-                                data=baml_rates_table.to_dict("records"),
+                                data=baml_rates_table,
                                 style_cell=dict(
                                     textAlign="right",
                                     font_family="sans-serif",
@@ -512,11 +486,12 @@ def serve_layout():
                             ),
                             html.P(),
                             dash_table.DataTable(
+                                id="corp-rates-table",
                                 columns=[
                                     {"name": i, "id": i}
-                                    for i in corp_rates_table.columns
+                                    for i in corp_rates_table[0]
                                 ],
-                                data=corp_rates_table.to_dict("records"),
+                                data=corp_rates_table,
                                 style_cell=dict(
                                     textAlign="right",
                                     font_family="sans-serif",
@@ -576,10 +551,11 @@ def serve_layout():
                             html.P(),
                             html.P(),
                             dash_table.DataTable(
+                                id="currency-table",
                                 columns=[
-                                    {"name": i, "id": i} for i in currency_table.columns
+                                    {"name": i, "id": i} for i in currency_table[0]
                                 ],
-                                data=currency_table.to_dict("records"),
+                                data=currency_table,
                                 style_cell=dict(
                                     textAlign="right",
                                     font_family="sans-serif",
@@ -633,11 +609,12 @@ def serve_layout():
                             html.P(),
                             html.Center(html.P("Commodities")),
                             dash_table.DataTable(
+                                id="commodities-table",
                                 columns=[
                                     {"name": i, "id": i}
-                                    for i in commodities_table.columns
+                                    for i in commodities_table[0]
                                 ],
-                                data=commodities_table.to_dict("records"),
+                                data=commodities_table,
                                 style_cell=dict(
                                     textAlign="right",
                                     font_family="sans-serif",
@@ -699,4 +676,56 @@ def serve_layout():
     return layout
 
 
-layout = serve_layout
\ No newline at end of file
+layout = serve_layout
+
+
+# Live update: only cells that moved since the client's version are sent
+
+@callback(
+    [Output(table_id, "columns") for table_id in DASHBOARD_TABLES],
+    Input("radios", "value"),
+)
+def update_horizon_headers(horizon):
+    label, _ = HORIZONS[horizon]
+    return [dashboard_columns(label)] * len(DASHBOARD_TABLES)
+
+
+@callback(
+    [Output(table_id, "data") for table_id in DASHBOARD_TABLES]
+    + [Output("dashboard-version", "data")],
+    Input("dashboard-interval", "n_intervals"),
+    Input("zscore-mode", "value"),
+    Input("radios", "value"),
+    State("dashboard-version", "data"),
+)
+def push_dashboard_deltas(n_intervals, mode, horizon, client):
+    # not memoized: the reply is a patch against whatever version the client
+    # holds, and the tables it diffs are already cached per (version, mode,
+    # horizon) by get_dashboard
+    _, days = HORIZONS[horizon]
+    version, records = get_dashboard(mode=mode, days=days)
+    current = {"version": version, "mode": mode, "days": days}
+    if current == client:
+        return [no_update] * (len(DASHBOARD_TABLES) + 1)
+
+    client_records = None
+    if client:
+        _, client_records = get_dashboard(client["version"], client["mode"], client["days"])
+    if client_records is None:
+        return [records[table_id] for table_id in DASHBOARD_TABLES] + [current]
+
+    deltas = dashboard_deltas(client_records, records)
+
+    outputs = []
+    for table_id in DASHBOARD_TABLES:
+        if table_id not in deltas:
+            outputs.append(no_update)
+        elif deltas[table_id] is None:
+            outputs.append(records[table_id])
+        else:
+            patch = Patch()
+            for row, column, value in deltas[table_id]:
+                patch[row][column] = value
+            outputs.append(patch)
+
+    return outputs + [current]
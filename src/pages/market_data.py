@@ -9,6 +9,7 @@ import dash
 from dash import dcc, html, Input, Output, State
 import dash_bootstrap_components as dbc
 import dash_auth
+from dash import callback, clientside_callback
 
 
 # Data visualization libraries
@@ -17,6 +18,12 @@ import plotly.express as px
 from plotly.subplots import make_subplots
 import plotly.io as pio
 
+from dashboard import DASHBOARD_TABLES
+from pyramid import get_pyramid
+from curve_pca import FACTORS, WINDOW, get_curve_pca
+from callback_cache import memoize_callback
+from commodities import COMMODITY_SERIES, ROLLING_WINDOWS, get_commodity_analytics
+
 TABS_STYLES = {
     'height': '44px'
 }
@@ -42,6 +49,89 @@ dash.register_page(
     name='Market Data'
 )
 
+# tab -> series offered in its history chart
+HISTORY_SERIES = {
+    'rates': DASHBOARD_TABLES["treas-rates-table"]
+    + DASHBOARD_TABLES["curve-rates-table"]
+    + DASHBOARD_TABLES["ilbe-rates-table"],
+    'credit': DASHBOARD_TABLES["baml-rates-table"] + DASHBOARD_TABLES["corp-rates-table"],
+    'vol': DASHBOARD_TABLES["vol-table"],
+}
+
+LEVEL_NAMES = {"D": "daily", "W": "weekly", "M": "monthly"}
+
+
+def history_panel(prefix):
+    series = HISTORY_SERIES[prefix]
+    return html.Div(children=[
+        html.P(),
+        dcc.Dropdown(id=f'{prefix}-history-series', options=series, value=series[0], clearable=False),
+        dcc.Store(id=f'{prefix}-history-width'),
+        dcc.Graph(id=f'{prefix}-history-graph'),
+    ])
+
+
+@memoize_callback
+def history_figure(series, relayout, width_px):
+    # draws the coarsest pyramid level that still fills the chart's width over
+    # the visible range, so long histories never ship every daily point
+    start = end = None
+    if relayout and 'xaxis.range[0]' in relayout:
+        start, end = relayout['xaxis.range[0]'], relayout['xaxis.range[1]']
+
+    level, df = get_pyramid().window(series, start, end, width_px or 1200)
+
+    fig = go.Figure()
+    if level != "D":
+        fig.add_trace(go.Scatter(x=df.index, y=df["high"], mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'))
+        fig.add_trace(go.Scatter(x=df.index, y=df["low"], mode='lines', line=dict(width=0), fill='tonexty', name='low-high'))
+    fig.add_trace(go.Scatter(x=df.index, y=df["close"], mode='lines', name=series))
+    fig.update_layout(
+        template="plotly_dark",
+        title=f"{series} ({LEVEL_NAMES[level]})",
+        uirevision=series,
+        height=450,
+    )
+    if start is not None:
+        fig.update_xaxes(range=[start, end])
+
+    return fig
+
+
+def curve_pca_panel():
+    return html.Div(children=[
+        html.P(),
+        html.Center(html.Div(f"Treasury Curve Factors (rolling {WINDOW}D PCA of daily changes)")),
+        dcc.Graph(id='rates-pca-explained'),
+        dcc.Graph(id='rates-pca-scores'),
+    ])
+
+
+def commodity_panel():
+    return html.Div(children=[
+        html.P(),
+        dbc.Row(children=[
+            dbc.Col(dcc.Dropdown(
+                id='commodity-series', options=COMMODITY_SERIES, value=COMMODITY_SERIES[0], clearable=False,
+            ), width=4),
+            dbc.Col(dbc.RadioItems(
+                id='commodity-view',
+                className="btn-group",
+                inputClassName="btn-check",
+                labelClassName="btn btn-outline-primary",
+                labelCheckedClassName="active",
+                options=[
+                    {"label": "Seasonality (Month)", "value": "monthly"},
+                    {"label": "Seasonality (Week)", "value": "weekly"},
+                    {"label": "Rolling Return / Vol", "value": "rolling"},
+                ],
+                value="monthly",
+            ), width=8),
+        ]),
+        dcc.Graph(id='commodity-graph'),
+    ])
+
+
 def serve_layout():
     layout = html.Div(children=[
         html.Br(),
@@ -50,10 +140,10 @@ def serve_layout():
             html.Hr(),
             html.Div(children=[
                 dcc.Tabs(children=[
-                    dcc.Tab(id='rates-tab', label='Rates Markets', style=TAB_STYLE, selected_style=TAB_SELECTED_STYLE),
-                    dcc.Tab(id='credit-tab', label='Credit Markets', style=TAB_STYLE, selected_style=TAB_SELECTED_STYLE),
-                    dcc.Tab(id='vol-tab', label='Volatility Markets', style=TAB_STYLE, selected_style=TAB_SELECTED_STYLE),
-                    dcc.Tab(id='commodity-tab', label='Commodity Markets', style=TAB_STYLE, selected_style=TAB_SELECTED_STYLE),
+                    dcc.Tab(id='rates-tab', children=[history_panel('rates'), curve_pca_panel()], label='Rates Markets', style=TAB_STYLE, selected_style=TAB_SELECTED_STYLE),
+                    dcc.Tab(id='credit-tab', children=history_panel('credit'), label='Credit Markets', style=TAB_STYLE, selected_style=TAB_SELECTED_STYLE),
+                    dcc.Tab(id='vol-tab', children=history_panel('vol'), label='Volatility Markets', style=TAB_STYLE, selected_style=TAB_SELECTED_STYLE),
+                    dcc.Tab(id='commodity-tab', children=commodity_panel(), label='Commodity Markets', style=TAB_STYLE, selected_style=TAB_SELECTED_STYLE),
                     dcc.Tab(id='econ-tab', label='Economic Data', style=TAB_STYLE, selected_style=TAB_SELECTED_STYLE),
 
                 ])
@@ -63,4 +153,84 @@ def serve_layout():
 
     return layout
 
-layout = serve_layout
\ No newline at end of file
+layout = serve_layout
+
+
+for prefix in HISTORY_SERIES:
+    clientside_callback(
+        """function(id) {
+            var el = document.getElementById(id);
+            return el ? el.offsetWidth : window.innerWidth;
+        }""",
+        Output(f'{prefix}-history-width', 'data'),
+        Input(f'{prefix}-history-graph', 'id'),
+    )
+
+    callback(
+        Output(f'{prefix}-history-graph', 'figure'),
+        Input(f'{prefix}-history-series', 'value'),
+        Input(f'{prefix}-history-graph', 'relayoutData'),
+        Input(f'{prefix}-history-width', 'data'),
+    )(history_figure)
+
+
+
+@callback(
+    Output('rates-pca-explained', 'figure'),
+    Output('rates-pca-scores', 'figure'),
+    Input('rates-pca-scores', 'id'),
+)
+@memoize_callback
+def curve_pca_figures(_):
+    pca = get_curve_pca()
+
+    explained = go.Figure()
+    for factor in FACTORS:
+        explained.add_trace(go.Scatter(
+            x=pca.index, y=pca[f"{factor} Explained"] * 100, name=factor, stackgroup='explained',
+        ))
+    explained.update_layout(
+        template="plotly_dark", title="Explained variance (%)", height=350, yaxis=dict(range=[0, 100]),
+    )
+
+    # cumulative scores read as the bp the curve has moved along each factor
+    scores = go.Figure()
+    for factor in FACTORS:
+        scores.add_trace(go.Scatter(x=pca.index, y=pca[factor].cumsum(), name=factor))
+    scores.update_layout(template="plotly_dark", title="Cumulative factor scores (bp)", height=350)
+
+    return explained, scores
+
+
+
+@callback(
+    Output('commodity-graph', 'figure'),
+    Input('commodity-series', 'value'),
+    Input('commodity-view', 'value'),
+)
+@memoize_callback
+def commodity_figure(series, view):
+    # the basket is computed in one pass per data version, so a miss here
+    # only slices the cached frames and draws
+    df = get_commodity_analytics()[view][series]
+
+    if view == "rolling":
+        fig = make_subplots(rows=2, cols=1, shared_xaxes=True, subplot_titles=["Return (%)", "Annualized Vol (%)"])
+        for days in ROLLING_WINDOWS:
+            fig.add_trace(go.Scatter(x=df.index, y=df[f"return_{days}d"], name=f"{days}D return"), row=1, col=1)
+            fig.add_trace(go.Scatter(x=df.index, y=df[f"vol_{days}d"], name=f"{days}D vol"), row=2, col=1)
+        title = f"{series}: rolling return and volatility"
+    else:
+        fig = go.Figure(go.Bar(
+            x=df.index,
+            y=df["mean_bp"],
+            customdata=df[["hit_rate", "days"]],
+            hovertemplate="%{y:.1f}bp/day, %{customdata[0]:.0%} up days, n=%{customdata[1]}<extra></extra>",
+        ))
+        bucket = "month" if view == "monthly" else "ISO week"
+        fig.update_xaxes(title=bucket)
+        fig.update_yaxes(title="mean daily return (bp)")
+        title = f"{series}: seasonality by {bucket}"
+
+    fig.update_layout(template="plotly_dark", title=title, height=500)
+    return fig
@@ -9,6 +9,8 @@ import dash
 from dash import dcc, html, Input, Output, State
 import dash_bootstrap_components as dbc
 import dash_auth
+from dash import dash_table
+from dash import callback
 
 
 # Data visualization libraries
@@ -17,6 +19,10 @@ import plotly.express as px
 from plotly.subplots import make_subplots
 import plotly.io as pio
 
+from macro_data import get_macro_snapshot
+from callback_cache import memoize_callback
+from stress import PORTFOLIO_SENSITIVITIES, WINDOW_DAYS, get_stress_windows, stress_episodes, worst_windows
+
 dash.register_page(
     __name__,
     order=6,
@@ -24,4 +30,100 @@ dash.register_page(
     name='Portfolio Analytics'
 )
 
-layout = html.Div('This is the Portfolio Analytics Page')
\ No newline at end of file
+STRESS_TABLE_STYLE = dict(
+    style_cell=dict(
+        textAlign="right",
+        font_family="sans-serif",
+        padding="3px",
+        border="none",
+    ),
+    style_header=dict(
+        backgroundColor="#005999",
+        font_family="sans-serif",
+        color="white",
+        border="none",
+    ),
+    style_data=dict(
+        backgroundColor="#4e5d6c",
+        font_family="sans-serif",
+        color="white",
+        border="none",
+    ),
+)
+
+
+def serve_layout():
+    portfolios = list(PORTFOLIO_SENSITIVITIES.columns)
+
+    layout = html.Div(children=[
+        html.Br(),
+        html.Center(html.H3('Historical Stress Scenarios')),
+        html.Hr(),
+        html.Center(html.Div(
+            """Every historical window of the chosen length, and a set of named episodes, replayed as
+            shocks to the macro factors each book is sensitive to. P&L in $k."""
+        )),
+        html.P(),
+        dbc.Row(children=[
+            dbc.Col(dcc.Dropdown(
+                id='stress-portfolio',
+                options=portfolios,
+                value=portfolios[0],
+                clearable=False,
+            ), width=4),
+            dbc.Col(dbc.RadioItems(
+                id='stress-window',
+                className="btn-group",
+                inputClassName="btn-check",
+                labelClassName="btn btn-outline-primary",
+                labelCheckedClassName="active",
+                options=[{"label": f"{days}D", "value": days} for days in WINDOW_DAYS],
+                value=WINDOW_DAYS[1],
+            ), width=4),
+        ]),
+        html.P(),
+        dbc.Row(children=[
+            dbc.Col(children=[
+                html.Center(html.Div("Worst Historical Windows")),
+                html.P(),
+                dash_table.DataTable(id='stress-worst-table', **STRESS_TABLE_STYLE),
+            ], width=6),
+            dbc.Col(children=[
+                html.Center(html.Div("Named Episodes")),
+                html.P(),
+                dash_table.DataTable(id='stress-episode-table', **STRESS_TABLE_STYLE),
+            ], width=6),
+        ]),
+    ])
+
+    return layout
+
+layout = serve_layout
+
+
+@callback(
+    Output('stress-worst-table', 'columns'),
+    Output('stress-worst-table', 'data'),
+    Output('stress-episode-table', 'columns'),
+    Output('stress-episode-table', 'data'),
+    Input('stress-portfolio', 'value'),
+    Input('stress-window', 'value'),
+)
+@memoize_callback
+def update_stress_tables(portfolio, days):
+    version, macro_df = get_macro_snapshot()
+
+    worst = worst_windows(get_stress_windows(version, macro_df, days)[portfolio])
+    worst = worst.rename("P&L").reset_index()
+
+    episodes = stress_episodes(macro_df)[["Start", "End", portfolio]]
+    episodes = episodes.rename(columns={portfolio: "P&L"}).sort_values("P&L").reset_index()
+
+    tables = []
+    for df in (worst, episodes):
+        df["Start"] = df["Start"].dt.strftime("%Y-%m-%d")
+        df["End"] = df["End"].dt.strftime("%Y-%m-%d")
+        df["P&L"] = df["P&L"].round(1)
+        tables += [[{"name": i, "id": i} for i in df.columns], df.to_dict("records")]
+
+    return tables
\ No newline at end of file
@@ -0,0 +1,86 @@
+# Sorted history of changes for empirical percentiles
+import threading
+from statistics import NormalDist
+
+import numpy as np
+
+from macro_data import get_macro_snapshot, only_appended
+
+
+class SortedChanges:
+    # every historical change of one series over one horizon, kept sorted so
+    # ranking a new change is a binary search
+    def __init__(self, changes):
+        changes = np.asarray(changes, dtype=np.float64)
+        self.values = np.sort(changes[~np.isnan(changes)])
+
+    def insert(self, changes):
+        # merge new changes in place of a full re-sort
+        changes = np.sort(np.asarray(changes, dtype=np.float64))
+        changes = changes[~np.isnan(changes)]
+        if len(changes):
+            self.values = np.insert(self.values, np.searchsorted(self.values, changes), changes)
+
+    def percentile(self, change):
+        # mid-rank share of history below `change`, in (0, 1)
+        n = len(self.values)
+        if n == 0 or np.isnan(change):
+            return np.nan
+        below = np.searchsorted(self.values, change, side="left")
+        at_or_below = np.searchsorted(self.values, change, side="right")
+        return (below + at_or_below + 1) / (2 * n + 2)
+
+
+class ChangeIndex:
+    # SortedChanges for every (series, horizon) of a macro frame
+    def __init__(self, macro_df, horizons):
+        self.horizons = list(horizons)
+        self.macro_df = macro_df
+        self.sorted = {}
+        for name in macro_df.columns:
+            values = macro_df[name].to_numpy(dtype=np.float64)
+            for days in self.horizons:
+                self.sorted[(name, days)] = SortedChanges(values[days:] - values[:-days])
+
+    def extend(self, macro_df):
+        # when rows were only appended, just their changes are inserted
+        rows = len(self.macro_df)
+        if not only_appended(self.macro_df, macro_df):
+            self.__init__(macro_df, self.horizons)
+            return
+
+        for name in macro_df.columns:
+            values = macro_df[name].to_numpy(dtype=np.float64)
+            for days in self.horizons:
+                start = max(rows, days)
+                self.sorted[(name, days)].insert(values[start:] - values[start - days:-days])
+
+        self.macro_df = macro_df
+
+    def percentile(self, name, days, change):
+        return self.sorted[(name, days)].percentile(change)
+
+    def zscore(self, name, days, change):
+        # the normal quantile of the empirical percentile, so the dashboard's
+        # ±1 / ±2 colour bands keep their tail probabilities on fat-tailed series
+        p = self.percentile(name, days, change)
+        return np.nan if np.isnan(p) else NormalDist().inv_cdf(p)
+
+
+# Index of the current snapshot, extended as new days arrive
+
+_index = {"version": None, "index": None}
+_index_lock = threading.Lock()
+
+
+def get_change_index(horizons):
+    version, macro_df = get_macro_snapshot()
+    with _index_lock:
+        if _index["version"] != version:
+            if _index["index"] is None or _index["index"].horizons != list(horizons):
+                _index["index"] = ChangeIndex(macro_df, horizons)
+            else:
+                _index["index"].extend(macro_df)
+            _index["version"] = version
+
+        return _index["index"]
@@ -0,0 +1,139 @@
+# Opt-in per-request profiling
+import io
+import os
+import re
+import hmac
+import time
+import pstats
+import cProfile
+
+from flask import Response, abort, g, request, send_file
+
+
+PROFILE_TOKEN = os.environ.get("RISKBOARD_PROFILE_TOKEN")
+PROFILE_DIR = os.environ.get("RISKBOARD_PROFILE_DIR", "profiles")
+# profiles kept on disk; the oldest is deleted once there are more
+PROFILE_KEEP = int(os.environ.get("RISKBOARD_PROFILE_KEEP", 50))
+
+PROFILE_HEADER = "X-Riskboard-Profile"
+PROFILE_QUERY = "__profile"
+
+# orderings offered by /_admin/profiles/<name>?sort=
+SORT_KEYS = set(pstats.Stats.sort_arg_dict_default)
+
+
+def _authorized(token):
+    supplied = request.headers.get(PROFILE_HEADER) or request.args.get(PROFILE_QUERY)
+    return supplied is not None and hmac.compare_digest(supplied, token)
+
+
+def _save(profiler, directory, keep, path):
+    os.makedirs(directory, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", path).strip("-") or "index"
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-{slug}.prof"
+    profiler.dump_stats(os.path.join(directory, name))
+
+    profiles = sorted(f for f in os.listdir(directory) if f.endswith(".prof"))
+    for old in profiles[:-keep]:
+        try:
+            os.remove(os.path.join(directory, old))
+        except FileNotFoundError:
+            pass
+
+    return name
+
+
+def install_profiler(
+    server, token=PROFILE_TOKEN, directory=PROFILE_DIR, keep=PROFILE_KEEP, authenticated=None
+):
+    # without a token nothing is registered, so requests pay nothing for this.
+    # before_request runs ahead of the app's login check on the view, so
+    # `authenticated` (e.g. the BasicAuth's is_authorized) is asked first and
+    # a request that is about to be refused is never profiled
+    if not token:
+        return False
+
+    directory = os.path.abspath(directory)
+
+    def logged_in():
+        if authenticated is None:
+            return True
+        try:
+            return authenticated()
+        except Exception:  # a malformed Authorization header
+            return False
+
+    @server.before_request
+    def start_profile():
+        if _authorized(token) and not request.path.startswith("/_admin/") and logged_in():
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:  # another profiler is already running
+                return
+            g.riskboard_profiler = profiler
+
+    @server.after_request
+    def stop_profile(response):
+        profiler = g.pop("riskboard_profiler", None)
+        if profiler is None:
+            return response
+
+        path = request.path
+
+        def finish():
+            profiler.disable()
+            _save(profiler, directory, keep, path)
+
+        if response.is_streamed:
+            # the body is generated after this hook runs, so keep profiling
+            # until the server has finished sending it
+            response.call_on_close(finish)
+        else:
+            profiler.disable()
+            response.headers[PROFILE_HEADER + "-Id"] = _save(profiler, directory, keep, path)
+        return response
+
+    @server.teardown_request
+    def abandon_profile(error):
+        # a request that raised skips after_request; the profiler must still
+        # come off this thread or every later request on it pays for it
+        profiler = g.pop("riskboard_profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            _save(profiler, directory, keep, request.path)
+
+    @server.route("/_admin/profiles")
+    def list_profiles():
+        if not _authorized(token):
+            abort(403)
+        profiles = sorted(
+            (f for f in os.listdir(directory) if f.endswith(".prof")), reverse=True
+        ) if os.path.isdir(directory) else []
+        return {"profiles": profiles}
+
+    @server.route("/_admin/profiles/<name>")
+    def serve_profile(name):
+        # pstats text by default, the raw .prof (for snakeviz etc.) with ?format=raw
+        if not _authorized(token):
+            abort(403)
+        path = os.path.join(directory, os.path.basename(name))
+        if not os.path.isfile(path):
+            abort(404)
+
+        if request.args.get("format") == "raw":
+            return send_file(path, as_attachment=True)
+
+        sort = request.args.get("sort", "cumulative")
+        limit = request.args.get("limit", 80, type=int)
+        if sort not in SORT_KEYS:
+            abort(400, f"sort must be one of {', '.join(sorted(SORT_KEYS))}")
+        if limit < 1:
+            abort(400, "limit must be a positive integer")
+
+        out = io.StringIO()
+        stats = pstats.Stats(path, stream=out)
+        stats.sort_stats(sort).print_stats(limit)
+        return Response(out.getvalue(), mimetype="text/plain")
+
+    return True
@@ -0,0 +1,100 @@
+# Daily / weekly / monthly OHLC levels behind the Market Data history charts
+import threading
+
+import numpy as np
+import pandas as pd
+
+from macro_data import get_macro_snapshot, only_appended
+
+
+# pyramid levels, finest first: (name, pandas period frequency)
+LEVELS = [("D", None), ("W", "W-FRI"), ("M", "M")]
+
+STATS = ["open", "high", "low", "close"]
+
+
+def _aggregate(macro_df, freq):
+    # one OHLC row per bucket for every series at once, indexed by the last
+    # date in the bucket. columns are (series, stat)
+    if freq is None:
+        return pd.concat({stat: macro_df for stat in STATS}, axis=1).swaplevel(axis=1)
+
+    buckets = macro_df.index.to_period(freq)
+    grouped = macro_df.groupby(buckets)
+    aggregated = pd.concat(
+        {"open": grouped.first(), "high": grouped.max(), "low": grouped.min(), "close": grouped.last()},
+        axis=1,
+    ).swaplevel(axis=1)
+    aggregated.index = pd.Series(macro_df.index, index=buckets).groupby(level=0).max().to_numpy()
+    aggregated.index.name = macro_df.index.name
+    return aggregated
+
+
+class Pyramid:
+    def __init__(self, macro_df):
+        self.macro_df = macro_df
+        self.levels = {name: _aggregate(macro_df, freq) for name, freq in LEVELS}
+
+    def extend(self, macro_df):
+        # when the new frame only appends rows to the old one, just the last
+        # (possibly partial) bucket of each level onward is recomputed
+        rows = len(self.macro_df)
+        if not only_appended(self.macro_df, macro_df):
+            self.__init__(macro_df)
+            return
+
+        for name, freq in LEVELS:
+            level = self.levels[name]
+            if freq is None:
+                start = rows
+            else:
+                # first row of the last bucket already in the pyramid
+                last_bucket = level.index[-1].to_period(freq)
+                start = int(np.searchsorted(macro_df.index.to_period(freq), last_bucket))
+            tail = _aggregate(macro_df.iloc[start:], freq)
+            kept = level.iloc[: len(level) - (0 if freq is None else 1)]
+            self.levels[name] = pd.concat([kept, tail])
+
+        self.macro_df = macro_df
+
+    def pick_level(self, start, end, width_px):
+        # the coarsest level that still has a bucket for every two pixels of
+        # the chart (each bucket is drawn as a low-high envelope)
+        for name, _ in reversed(LEVELS):
+            index = self.levels[name].index
+            buckets = np.searchsorted(index, end, side="right") - np.searchsorted(index, start)
+            if buckets * 2 >= width_px:
+                return name
+        return LEVELS[0][0]
+
+    def window(self, series, start=None, end=None, width_px=1200):
+        # (level, OHLC frame) for one series over [start, end]
+        daily = self.levels[LEVELS[0][0]].index
+        start = pd.Timestamp(start) if start is not None else daily[0]
+        end = pd.Timestamp(end) if end is not None else daily[-1]
+
+        level = self.pick_level(start, end, width_px)
+        df = self.levels[level][series]
+        # one bucket either side so lines run to the chart edges
+        lo = max(np.searchsorted(df.index, start) - 1, 0)
+        hi = np.searchsorted(df.index, end, side="right") + 1
+        return level, df.iloc[lo:hi]
+
+
+# Pyramid of the current snapshot, extended on each refresh
+
+_pyramid = {"version": None, "pyramid": None}
+_pyramid_lock = threading.Lock()
+
+
+def get_pyramid():
+    version, macro_df = get_macro_snapshot()
+    with _pyramid_lock:
+        if _pyramid["version"] != version:
+            if _pyramid["pyramid"] is None:
+                _pyramid["pyramid"] = Pyramid(macro_df)
+            else:
+                _pyramid["pyramid"].extend(macro_df)
+            _pyramid["version"] = version
+
+        return _pyramid["pyramid"]
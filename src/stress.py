@@ -0,0 +1,184 @@
+# Historical stress scenarios priced against factor sensitivities
+import threading
+
+import numpy as np
+import pandas as pd
+
+from dashboard import DASHBOARD_TABLES
+
+
+# how each factor's shock is measured
+#   "bp"      level change in basis points (yields in % are scaled by 100)
+#   "points"  level change in the series' own units
+#   "return"  percentage return
+FACTOR_SHOCKS = {}
+for _table_id, _kind in [
+    ("treas-rates-table", "bp"),
+    ("curve-rates-table", "bp"),
+    ("ilbe-rates-table", "bp"),
+    ("equity-indices-table", "return"),
+    ("vol-table", "points"),
+    ("baml-rates-table", "bp"),
+    ("corp-rates-table", "bp"),
+    ("currency-table", "return"),
+    ("commodities-table", "return"),
+]:
+    for _name in DASHBOARD_TABLES[_table_id]:
+        FACTOR_SHOCKS[_name] = _kind
+
+# yields and curve spreads are stored in %, OAS is already in bp
+PERCENT_FACTORS = (
+    DASHBOARD_TABLES["treas-rates-table"]
+    + DASHBOARD_TABLES["curve-rates-table"]
+    + DASHBOARD_TABLES["ilbe-rates-table"]
+)
+
+# illustrative books, P&L in $k per unit shock (1bp, 1 vol point or 1% return)
+PORTFOLIO_SENSITIVITIES = pd.DataFrame(
+    {
+        "60/40 Balanced": {"SPX": 600.0, "10yTreas": -34.0},
+        "IG Credit": {"BAML IG OAS": -70.0, "10yTreas": -40.0},
+        "High Yield": {"BAML HY OAS": -38.0, "5yTreas": -12.0, "SPX": 50.0},
+        "Global Equity": {
+            "SPX": 300.0,
+            "FTSE": 120.0,
+            "DAX": 120.0,
+            "Nikkei": 150.0,
+            "Hang Seng": 100.0,
+            "EURUSD": 120.0,
+            "USDJPY": -150.0,
+        },
+        "Long Vol Overlay": {"VIX": 25.0, "SPX": -40.0},
+        "Commodities": {"Copper": 250.0, "Gold": 250.0},
+    }
+).fillna(0.0)
+
+# named historical episodes, (first day, last day)
+EPISODES = {
+    "Lehman / GFC 2008": ("2008-09-01", "2008-11-20"),
+    "Euro Crisis 2011": ("2011-07-22", "2011-08-08"),
+    "Taper Tantrum 2013": ("2013-05-02", "2013-06-24"),
+    "China Devaluation 2015": ("2015-08-10", "2015-08-25"),
+    "Volmageddon 2018": ("2018-01-26", "2018-02-08"),
+    "COVID March 2020": ("2020-02-19", "2020-03-23"),
+    "Rates Shock 2022": ("2022-01-03", "2022-10-21"),
+}
+
+WINDOW_DAYS = [5, 21, 63]
+
+# rows a level is carried forward over a gap (e.g. a foreign market holiday)
+# before the factor counts as missing
+FILL_LIMIT = 5
+
+
+def _factor_values(macro_df, factors):
+    values = macro_df[factors].ffill(limit=FILL_LIMIT).to_numpy(dtype=np.float64)
+    scale = np.array([100.0 if name in PERCENT_FACTORS else 1.0 for name in factors])
+    is_return = np.array([FACTOR_SHOCKS.get(name) == "return" for name in factors])
+    return values, scale, is_return
+
+
+def _shocks(start_values, end_values, scale, is_return):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(
+            is_return,
+            (end_values / start_values - 1) * 100,
+            (end_values - start_values) * scale,
+        )
+
+
+def window_shocks(macro_df, days, factors):
+    # shocks over every window of `days` rows, as a (windows x factors) matrix
+    values, scale, is_return = _factor_values(macro_df, factors)
+    return _shocks(values[:-days], values[days:], scale, is_return)
+
+
+def episode_shocks(macro_df, factors, episodes=EPISODES):
+    values, scale, is_return = _factor_values(macro_df, factors)
+    index = macro_df.index
+    first = index.searchsorted(pd.to_datetime([start for start, _ in episodes.values()]), side="right") - 1
+    last = index.searchsorted(pd.to_datetime([end for _, end in episodes.values()]), side="right") - 1
+    inside = (first >= 0) & (last > first)
+    first, last = np.clip(first, 0, None), np.clip(last, 0, None)
+    shocks = _shocks(values[first], values[last], scale, is_return)
+    shocks[~inside] = np.nan
+    return shocks, index[first], index[last]
+
+
+def _portfolio_pnl(shocks, sensitivities):
+    # shocks @ sensitivities, except that a window missing a factor a book is
+    # exposed to gets NaN P&L for that book instead of silently losing the
+    # factor; factors a book has no exposure to don't matter
+    missing = np.isnan(shocks)
+    pnl = np.where(missing, 0.0, shocks) @ sensitivities
+    pnl[(missing @ (sensitivities != 0)) > 0] = np.nan
+    return pnl
+
+
+def stress_windows(macro_df, days, sensitivities=PORTFOLIO_SENSITIVITIES):
+    # P&L of every portfolio over every historical window of `days` rows in a
+    # single (windows x factors) @ (factors x portfolios) product
+    factors = [name for name in sensitivities.index if name in macro_df]
+    shocks = window_shocks(macro_df, days, factors)
+    pnl = _portfolio_pnl(shocks, sensitivities.loc[factors].to_numpy())
+
+    return pd.DataFrame(
+        pnl,
+        index=pd.MultiIndex.from_arrays(
+            [macro_df.index[:-days], macro_df.index[days:]], names=["Start", "End"]
+        ),
+        columns=sensitivities.columns,
+    )
+
+
+def stress_episodes(macro_df, sensitivities=PORTFOLIO_SENSITIVITIES, episodes=EPISODES):
+    factors = [name for name in sensitivities.index if name in macro_df]
+    shocks, starts, ends = episode_shocks(macro_df, factors, episodes)
+    pnl = _portfolio_pnl(shocks, sensitivities.loc[factors].to_numpy())
+
+    df = pd.DataFrame(pnl, index=list(episodes), columns=sensitivities.columns)
+    df.insert(0, "End", ends)
+    df.insert(0, "Start", starts)
+    return df.rename_axis("Episode")
+
+
+def worst_windows(pnl, n=20):
+    # the n worst windows of one portfolio's P&L series, skipping any window
+    # that overlaps a worse one already picked so a single selloff isn't
+    # listed twenty times with its start shifted by a day. Windows with
+    # missing data are left out
+    pnl = pnl.dropna()
+    order = np.argsort(pnl.to_numpy(), kind="stable")
+    starts = pnl.index.get_level_values("Start")
+    ends = pnl.index.get_level_values("End")
+
+    picked = []
+    for i in order:
+        if len(picked) == n:
+            break
+        if all(ends[i] <= starts[j] or starts[i] >= ends[j] for j in picked):
+            picked.append(i)
+
+    return pnl.iloc[picked]
+
+
+# Stress tables per data version
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def get_stress_windows(version, macro_df, days):
+    key = (version, days)
+    with _tables_lock:
+        if key in _tables:
+            return _tables[key]
+
+    pnl = stress_windows(macro_df, days)
+
+    with _tables_lock:
+        for stale in [k for k in _tables if k[0] != version]:
+            del _tables[stale]
+        _tables[key] = pnl
+
+    return pnl
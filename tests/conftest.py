@@ -0,0 +1,22 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# the app's modules live flat in src/, as the app itself runs them
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "src"))
+
+
+@pytest.fixture
+def macro_df():
+    # a few years of random-walk levels shaped like load_macro_df's output,
+    # with one series that starts after the others
+    dates = pd.bdate_range("2015-01-01", periods=800, name="date")
+    rng = np.random.default_rng(0)
+    columns = ["SPX", "VIX", "VVIX", "10yTreas"]
+    levels = 100 + np.cumsum(rng.standard_t(4, size=(len(dates), len(columns))), axis=0)
+    df = pd.DataFrame(levels.astype(np.float32), index=dates, columns=columns)
+    df.iloc[:150, df.columns.get_loc("VVIX")] = np.nan
+    return df
@@ -0,0 +1,81 @@
+import time
+
+import numpy as np
+import pytest
+
+from alerts import AlertEngine
+
+
+class ListSink:
+    def __init__(self, delay=0.0):
+        self.alerts = []
+        self.delay = delay
+
+    def send(self, alert):
+        time.sleep(self.delay)
+        self.alerts.append(alert)
+
+
+@pytest.fixture
+def breach_df(macro_df):
+    # SPX jumps far outside its usual 5-day range on the last day; VIX is flat
+    df = macro_df[["SPX", "VIX"]].astype(np.float64)
+    df.iloc[-1, 0] += 50 * df["SPX"].diff(5).std()
+    df.iloc[-1, 1] = df.iloc[-6, 1]
+    return df
+
+
+def thresholds():
+    return {"SPX": {5: (1.0, 2.0)}, "VIX": {5: (1.0, 2.0)}}
+
+
+def test_first_snapshot_is_a_baseline(breach_df):
+    sink = ListSink()
+    engine = AlertEngine(sink, thresholds())
+
+    engine.on_refresh(None, breach_df, "v1", time.time())
+    engine.flush()
+    assert sink.alerts == []
+
+    # the same standing breach on a later refresh is still not news
+    engine.on_refresh(breach_df.iloc[:-1], breach_df, "v2", time.time())
+    engine.flush()
+    assert sink.alerts == []
+
+
+def test_new_breach_is_sent_once(breach_df):
+    sink = ListSink()
+    engine = AlertEngine(sink, thresholds())
+    engine.on_refresh(None, breach_df.iloc[:-1], "v1", time.time())
+
+    engine.on_refresh(breach_df.iloc[:-1], breach_df, "v2", time.time())
+    engine.evaluate(breach_df, ["SPX"])
+    engine.flush()
+    assert [(a["series"], a["level"]) for a in sink.alerts] == [("SPX", "alarm")]
+    assert "latency_ms" in sink.alerts[0]
+
+
+def test_missing_latest_value_keeps_the_band(breach_df):
+    sink = ListSink()
+    engine = AlertEngine(sink, thresholds())
+    engine.on_refresh(None, breach_df, "v1", time.time())
+
+    gap = breach_df.copy()
+    gap.iloc[-1, 0] = np.nan
+    engine.evaluate(gap, ["SPX"])
+    engine.evaluate(breach_df, ["SPX"])
+    engine.flush()
+    assert sink.alerts == []
+
+
+def test_slow_sink_does_not_block_evaluation(breach_df):
+    sink = ListSink(delay=0.5)
+    engine = AlertEngine(sink, thresholds())
+    engine.on_refresh(None, breach_df.iloc[:-1], "v1", time.time())
+
+    started = time.perf_counter()
+    alerts = engine.evaluate(breach_df, ["SPX"])
+    assert alerts and time.perf_counter() - started < 0.25
+
+    engine.flush()
+    assert len(sink.alerts) == 1 and engine.metrics()["sent"] == 1
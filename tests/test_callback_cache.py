@@ -0,0 +1,74 @@
+import os
+import pickle
+
+import plotly.graph_objects as go
+
+import callback_cache
+from callback_cache import CallbackCache, memoize_callback
+
+
+def test_disk_tier_round_trip(tmp_path):
+    writer = CallbackCache(disk_dir=str(tmp_path), secret="s3cret")
+    writer.set("v1", "abc", pickle.dumps({"x": 1}))
+
+    reader = CallbackCache(disk_dir=str(tmp_path), secret="s3cret")
+    assert pickle.loads(reader.get("v1", "abc")) == {"x": 1}
+    assert reader.disk_hits == 1
+    assert os.stat(tmp_path).st_mode & 0o077 == 0
+
+
+def test_disk_tier_rejects_unsigned_and_foreign_files(tmp_path):
+    cache = CallbackCache(disk_dir=str(tmp_path), secret="s3cret")
+    with open(tmp_path / "v1-forged.pkl", "wb") as f:
+        f.write(b"\0" * 32 + pickle.dumps("payload"))
+    CallbackCache(disk_dir=str(tmp_path), secret="other").set("v1", "foreign", pickle.dumps(1))
+
+    assert cache.get("v1", "forged") is None
+    assert cache.get("v1", "foreign") is None
+    assert cache.rejected == 2
+    assert cache.misses == 2
+
+
+def test_disk_tier_needs_a_secret(tmp_path):
+    assert CallbackCache(disk_dir=str(tmp_path / "cache"), secret=None).disk_dir is None
+
+
+def test_evicts_least_recently_used_past_byte_cap():
+    cache = CallbackCache(max_bytes=250, disk_dir=None)
+    for key in ["a", "b", "c"]:
+        cache.set("v1", key, bytes(100))
+    assert cache.get("v1", "a") is None
+
+    cache.get("v1", "b")
+    cache.set("v1", "d", bytes(100))
+    assert cache.get("v1", "c") is None
+    assert cache.get("v1", "b") is not None
+    assert cache.evictions == 2
+    assert cache.metrics()["bytes"] == 200
+
+
+def test_invalidate_drops_other_versions(tmp_path):
+    cache = CallbackCache(disk_dir=str(tmp_path), secret="s3cret")
+    cache.set("old", "abc", pickle.dumps(1))
+    cache.set("new", "abc", pickle.dumps(2))
+
+    cache.invalidate("new")
+    assert cache.get("old", "abc") is None
+    assert pickle.loads(cache.get("new", "abc")) == 2
+    assert os.listdir(tmp_path) == ["new-abc.pkl"]
+
+
+def test_memoize_caches_figures_as_dicts(monkeypatch):
+    monkeypatch.setattr(callback_cache, "get_macro_snapshot", lambda: ("v1", None))
+    cache = CallbackCache(disk_dir=None)
+    calls = []
+
+    @memoize_callback(cache=cache)
+    def figure(title):
+        calls.append(title)
+        return go.Figure(layout={"title": title}), "label"
+
+    first = figure("a")
+    assert figure("a") == first
+    assert calls == ["a"]
+    assert isinstance(first[0], dict) and first[0]["layout"]["title"]["text"] == "a"
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from curve_pca import CURVE, rolling_curve_pca
+
+WINDOW = 60
+
+
+@pytest.fixture
+def curve_df():
+    # yields driven by level, slope and curvature factors of decreasing size,
+    # so the window's top three eigenvalues are well separated
+    dates = pd.bdate_range("2015-01-01", periods=500, name="date")
+    rng = np.random.default_rng(1)
+    factors = np.cumsum(rng.normal(0, [0.05, 0.03, 0.01], size=(len(dates), 3)), axis=0)
+    loadings = np.array([[1, 1, 1, 1], [-1, -0.3, 0.4, 1], [-0.5, 1, 0.5, -1]])
+    curve = 3 + factors @ loadings + rng.normal(0, 0.005, size=(len(dates), len(CURVE)))
+    return pd.DataFrame(curve, index=dates, columns=CURVE)
+
+
+def test_streaming_matches_per_window_eigh(curve_df):
+    result, _ = rolling_curve_pca(curve_df, window=WINDOW)
+    changes = curve_df.diff().to_numpy() * 100
+
+    assert len(result) == len(curve_df) - WINDOW
+    for date, row in result.iterrows():
+        i = curve_df.index.get_loc(date)
+        cov = np.cov(changes[i - WINDOW + 1:i + 1].T)
+        values, vectors = np.linalg.eigh(cov)
+        values, vectors = values[::-1][:3], vectors[:, ::-1][:, :3]
+
+        explained = row[[f"{f} Explained" for f in ["Level", "Slope", "Curvature"]]].to_numpy()
+        np.testing.assert_allclose(explained, values / np.trace(cov), atol=1e-6)
+
+        streamed = row[[f"{f} {t}" for f in ["Level", "Slope", "Curvature"] for t in CURVE]]
+        streamed = streamed.to_numpy(dtype=np.float64).reshape(3, len(CURVE)).T
+        # eigenvectors are only defined up to sign
+        np.testing.assert_allclose(np.abs(np.sum(streamed * vectors, axis=0)), 1, atol=1e-4)
+
+
+def test_incremental_matches_single_pass(curve_df):
+    full, _ = rolling_curve_pca(curve_df, window=WINDOW)
+
+    head = curve_df.iloc[:-40]
+    result, engine = rolling_curve_pca(head, window=WINDOW)
+    tail, _ = rolling_curve_pca(curve_df, engine=engine, start=len(head))
+
+    pd.testing.assert_frame_equal(pd.concat([result, tail]), full)
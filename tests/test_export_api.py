@@ -0,0 +1,36 @@
+import base64
+import io
+
+import pandas as pd
+import pytest
+
+import export_api
+
+AUTH = {"Authorization": "Basic " + base64.b64encode(b"root:root").decode()}
+
+
+@pytest.fixture
+def client(monkeypatch, macro_df):
+    from app import server
+
+    monkeypatch.setattr(export_api, "get_macro_snapshot", lambda: ("v1", macro_df))
+    return server.test_client()
+
+
+@pytest.mark.parametrize("start", ["notadate", "NaT"])
+def test_bad_dates_are_rejected(client, start):
+    assert client.get(f"/api/macro?start={start}", headers=AUTH).status_code == 400
+
+
+@pytest.mark.parametrize("start", ["2016-01-01", "2016-01-01T00:00:00Z", "2015-12-31T19:00:00-05:00"])
+def test_naive_and_aware_dates_select_the_same_rows(client, start):
+    response = client.get(f"/api/macro?series=SPX&start={start}", headers=AUTH)
+    assert response.status_code == 200
+    df = pd.read_csv(io.BytesIO(response.get_data()), index_col=0)
+    assert df.index[0] == "2016-01-01"
+
+
+def test_repeated_series_are_sent_once(client):
+    response = client.get("/api/macro?series=SPX,SPX&format=json", headers=AUTH)
+    assert response.status_code == 200
+    assert list(pd.read_json(io.BytesIO(response.get_data())).columns) == ["date", "SPX"]
@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+
+import macro_data
+
+
+@pytest.fixture
+def snapshot(monkeypatch, macro_df):
+    # a fresh snapshot whose loads hand out frames from `frames` in turn
+    monkeypatch.setattr(macro_data, "_snapshot", {
+        "version": None,
+        "df": None,
+        "quality": None,
+        "loaded_at": 0.0,
+        "loading": False,
+        "failures": 0,
+        "retry_at": 0.0,
+    })
+    monkeypatch.setattr(macro_data, "_listeners", [])
+    monkeypatch.setattr(macro_data, "REFRESH_SECONDS", 300)
+
+    frames = [macro_df.iloc[:-1], macro_df.iloc[:-1].copy(), macro_df]
+    loads = []
+
+    def load_macro_df():
+        loads.append(len(loads))
+        frame = frames[min(len(loads), len(frames)) - 1]
+        if isinstance(frame, Exception):
+            raise frame
+        return frame
+
+    monkeypatch.setattr(macro_data, "load_macro_df", load_macro_df)
+    return frames, loads
+
+
+def expire():
+    macro_data._snapshot["loaded_at"] = 0.0
+
+
+def test_version_moves_only_when_content_does(snapshot):
+    frames, loads = snapshot
+    refreshes = []
+    macro_data.on_refresh(lambda previous, df, version, arrived_at: refreshes.append((previous, version)))
+
+    first, _ = macro_data.get_macro_snapshot()
+    assert macro_data.get_macro_snapshot()[0] == first
+    assert len(loads) == 1
+
+    expire()
+    assert macro_data.get_macro_snapshot()[0] == first
+
+    expire()
+    version, df = macro_data.get_macro_snapshot()
+    assert version != first and df is frames[2]
+    assert [v for _, v in refreshes] == [first, version]
+    assert refreshes[0][0] is None and refreshes[1][0] is frames[1]
+
+
+def test_failed_reload_serves_last_snapshot_and_backs_off(snapshot):
+    frames, loads = snapshot
+    frames[1] = OSError("S3 unavailable")
+
+    version, df = macro_data.get_macro_snapshot()
+    expire()
+    assert macro_data.get_macro_snapshot() == (version, df)
+    assert len(loads) == 2
+
+    # still due, but inside the backoff: no new fetch
+    assert macro_data.get_macro_snapshot() == (version, df)
+    assert len(loads) == 2
+    assert macro_data._snapshot["retry_at"] > macro_data._snapshot["loaded_at"]
+
+    macro_data._snapshot["retry_at"] = 0.0
+    frames[1] = frames[2]
+    assert macro_data.get_macro_snapshot()[1] is frames[2]
+    assert macro_data._snapshot["failures"] == 0
+
+
+def test_readers_are_not_blocked_by_a_reload(snapshot, monkeypatch):
+    frames, loads = snapshot
+    version, df = macro_data.get_macro_snapshot()
+
+    started, release = threading.Event(), threading.Event()
+
+    def slow_load():
+        started.set()
+        release.wait(5)
+        return frames[2]
+
+    monkeypatch.setattr(macro_data, "load_macro_df", slow_load)
+    expire()
+    reloader = threading.Thread(target=macro_data.get_macro_snapshot)
+    reloader.start()
+    assert started.wait(5)
+
+    # the reload is in flight: other callers get the current snapshot at once
+    assert macro_data.get_macro_snapshot() == (version, df)
+
+    release.set()
+    reloader.join(5)
+    assert macro_data.get_macro_snapshot()[1] is frames[2]
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from percentile import ChangeIndex
+
+HORIZONS = [1, 5, 252]
+
+
+@pytest.mark.parametrize("appended", [1, 3, 30, 300])
+def test_extend_matches_rebuild(macro_df, appended):
+    index = ChangeIndex(macro_df.iloc[:-appended], HORIZONS)
+    index.extend(macro_df)
+
+    rebuilt = ChangeIndex(macro_df, HORIZONS)
+    assert index.sorted.keys() == rebuilt.sorted.keys()
+    for key, changes in rebuilt.sorted.items():
+        np.testing.assert_array_equal(index.sorted[key].values, changes.values)
+
+
+def test_percentile_matches_brute_force(macro_df):
+    index = ChangeIndex(macro_df, HORIZONS)
+    values = macro_df["VIX"].to_numpy(dtype=np.float64)
+    changes = values[5:] - values[:-5]
+
+    for change in [changes.min(), np.median(changes), changes[-1], changes.max() + 1]:
+        below = np.sum(changes < change)
+        at_or_below = np.sum(changes <= change)
+        expected = (below + at_or_below + 1) / (2 * len(changes) + 2)
+        assert index.percentile("VIX", 5, change) == pytest.approx(expected)
@@ -0,0 +1,55 @@
+import sys
+
+import pytest
+from flask import Flask, request
+
+from profiling import PROFILE_HEADER, install_profiler
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = Flask(__name__)
+    install_profiler(
+        server, token="tok", directory=str(tmp_path), authenticated=lambda: request.headers["X-User"] == "ok"
+    )
+
+    @server.route("/work")
+    def work():
+        return "done"
+
+    @server.route("/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    return server
+
+
+def profiles(server):
+    return server.test_client().get("/_admin/profiles?__profile=tok").get_json()["profiles"]
+
+
+def test_only_logged_in_requests_are_profiled(server):
+    client = server.test_client()
+    client.get("/work?__profile=tok", headers={"X-User": "ok"})
+    client.get("/work?__profile=tok", headers={"X-User": "stranger"})
+    client.get("/work?__profile=tok")
+    assert len(profiles(server)) == 1
+
+
+def test_failing_request_leaves_no_profiler_running(server):
+    server.config["PROPAGATE_EXCEPTIONS"] = True
+    with pytest.raises(RuntimeError):
+        server.test_client().get("/boom?__profile=tok", headers={"X-User": "ok"})
+    assert sys.getprofile() is None
+    assert len(profiles(server)) == 1
+
+
+def test_report_parameters_are_validated(server):
+    client = server.test_client()
+    name = client.get("/work?__profile=tok", headers={"X-User": "ok"}).headers[PROFILE_HEADER + "-Id"]
+    report = f"/_admin/profiles/{name}?__profile=tok"
+
+    assert client.get(report + "&limit=x").status_code == 200
+    assert client.get(report + "&limit=0").status_code == 400
+    assert client.get(report + "&sort=tottime").status_code == 200
+    assert client.get(report + "&sort=__class__").status_code == 400
@@ -0,0 +1,24 @@
+import pandas as pd
+import pytest
+
+from pyramid import LEVELS, Pyramid
+
+
+@pytest.mark.parametrize("appended", [1, 3, 7, 30])
+def test_extend_matches_rebuild(macro_df, appended):
+    pyramid = Pyramid(macro_df.iloc[:-appended])
+    pyramid.extend(macro_df)
+
+    rebuilt = Pyramid(macro_df)
+    for name, _ in LEVELS:
+        pd.testing.assert_frame_equal(pyramid.levels[name], rebuilt.levels[name])
+
+
+def test_extend_rebuilds_when_history_changes(macro_df):
+    pyramid = Pyramid(macro_df.iloc[:-5])
+    revised = macro_df.copy()
+    revised.iloc[10, 0] += 1
+
+    pyramid.extend(revised)
+    for name, _ in LEVELS:
+        pd.testing.assert_frame_equal(pyramid.levels[name], Pyramid(revised).levels[name])
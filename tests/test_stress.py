@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+from stress import FILL_LIMIT, stress_windows, worst_windows
+
+BOOKS = pd.DataFrame({"Equity": {"SPX": 100.0, "VIX": 0.0}, "Vol": {"SPX": 0.0, "VIX": 10.0}})
+
+
+def test_short_gap_is_carried_forward(macro_df):
+    gapped = macro_df.copy()
+    gapped.iloc[400, gapped.columns.get_loc("SPX")] = np.nan
+
+    pnl = stress_windows(gapped, 21, BOOKS)
+    assert not pnl.isna().any().any()
+    assert (pnl["Equity"] != 0).all()
+
+
+def test_long_gap_leaves_only_exposed_books_missing(macro_df):
+    gapped = macro_df.copy()
+    gapped.iloc[400:400 + FILL_LIMIT + 5, gapped.columns.get_loc("SPX")] = np.nan
+
+    pnl = stress_windows(gapped, 21, BOOKS)
+    assert pnl["Equity"].isna().any()
+    assert not pnl["Vol"].isna().any()
+
+    worst = worst_windows(pnl["Equity"], n=10)
+    assert len(worst) == 10 and not worst.isna().any()